@@ -0,0 +1,220 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import scipy
+import generators
+import iterative
+import precision
+import solver as sv
+import truss2D as tc
+
+
+# Benchmark suite: solves the generated truss families (generators.py) at a range of sizes, times every
+# phase of the analysis separately, records the peak memory allocated in each phase (tracemalloc, so
+# numpy/scipy arrays are counted but memory allocated inside SuperLU/LAPACK is not), checks the results
+# against closed-form solutions and writes everything as JSON so that runs can be compared.
+#   python benchmark.py                                    # all families, 10 to 100,000 members
+#   python benchmark.py -f pratt lattice -s 1000 1000000 -o after.json
+#   python benchmark.py --compare before.json after.json   # exit status 1 on a regression
+#
+# Phases (the steps of truss2D.TrussAnalysis, run one by one):
+#   input          entry tables -> TrussModel (validation; element geometry is computed here)
+#   geometry       element lengths and direction cosines alone (already part of input, shown separately)
+#   element        element stiffness matrices
+#   assembly       COO scatter and conversion to CSR
+#   partition      free / fixed DOFs and extraction of Kff
+#   ordering       reverse Cuthill-McKee node ordering
+#   factorization, solve, reactions (R = K q - F), recovery (element stresses)
+PHASES = ['input', 'geometry', 'element', 'assembly', 'partition', 'ordering', 'factorization', 'solve',
+          'reactions', 'recovery']
+SIZES  = [10, 100, 1000, 10000, 100000]
+SETTLEMENT_MAX = 10000                                            # Largest case given the settlement check
+
+
+# Calls mark(phase) at the start of every phase and mark(None) at the end
+def _pipeline(truss, mark):
+    mark('input')
+    model = tc.TrussModel.from_entries(truss.coords, truss.elements, truss.prescribed, truss.point_load)
+    mark('geometry')
+    tc.element_geometry(model.coord, model.lnods)
+    mark('element')
+    ke = tc.element_stiffness(model.young, model.csarea, model.elength, model.ecos, model.esin)
+    mark('assembly')
+    K = tc.assemble_stiffness(model.ngdof, model.lnods, ke)
+    mark('partition')
+    free, F = model.free_dofs, model.F
+    Kff = K[free][:, free]
+    mark('ordering')
+    perm = sv.dof_order(sv.rcm_node_order(model.lnods, model.nnode), free)
+    mark('factorization')
+    factor = sv.factorize(Kff, perm=perm, dofs=free)
+    mark('solve')
+    q = np.zeros(model.ngdof)
+    q[free] = factor.solve(F[free])
+    mark('reactions')
+    R = K @ q - F
+    mark('recovery')
+    stresses = tc.recover_elements(model, q)['stress']
+    mark(None)
+    return model, factor, R, stresses
+
+
+class _Timer:
+
+    def __init__(self):
+        self.times = {}
+        self.phase = None
+
+    def __call__(self, phase):
+        now = time.perf_counter()
+        if self.phase is not None:
+            self.times[self.phase] = now - self.start
+        self.phase, self.start = phase, now
+
+
+class _Memory:
+
+    def __init__(self):
+        self.peaks = {}
+        self.phase = None
+
+    def __call__(self, phase):
+        current, peak = tracemalloc.get_traced_memory()
+        if self.phase is not None:
+            self.peaks[self.phase] = peak - self.base
+        tracemalloc.reset_peak()
+        self.phase, self.base = phase, current
+
+
+# One family at one size: best-of-`repeat` phase times, peak memory per phase and the closed-form checks
+def run_case(family, members, repeat=3, memory=True, rtol=1e-5):
+    truss = generators.sized(family, members)
+    times = None
+    for _ in range(repeat):
+        timer = _Timer()
+        model, factor, R, stresses = _pipeline(truss, timer)
+        times = timer.times if times is None else {p: min(t, timer.times[p]) for p, t in times.items()}
+
+    peaks = None
+    if memory:
+        meter = _Memory()
+        tracemalloc.start()
+        try:
+            _pipeline(truss, meter)
+        finally:
+            tracemalloc.stop()
+        peaks = meter.peaks
+
+    checks = []
+    for description, kind, index, value in truss.expected:
+        got = float(np.sum(R[index])) if kind == 'reaction' else float(stresses[index])
+        error = abs(got - value) / abs(value)
+        checks.append({'check': description, 'expected': value, 'computed': got, 'rel_error': error,
+                       'ok': bool(error <= rtol)})
+
+    if model.nelem <= SETTLEMENT_MAX:
+        checks += _settlement_checks(truss, rtol)
+
+    return {'family': family, 'target_members': members, 'members': model.nelem, 'nodes': model.nnode,
+            'dofs': len(model.free_dofs), 'nnz': int(factor.stats['nnz']), 'method': factor.method,
+            'total': sum(t for p, t in times.items() if p != 'geometry'), 'phases': times, 'memory': peaks,
+            'checks': checks}
+
+
+# The first support settles by span / 1000 in Y: solve_iterative (IC-preconditioned) and solve_mixed must
+# reproduce the displacements of TrussAnalysis.solve(F, U)
+def _settlement_checks(truss, rtol):
+    prescribed = np.c_[truss.prescribed, np.zeros((len(truss.prescribed), 2))]
+    prescribed[0, 4] = -np.ptp(truss.coords[:, 0]) / 1000
+    model = tc.TrussModel.from_entries(truss.coords, truss.elements, prescribed, truss.point_load)
+    q = tc.TrussAnalysis(model).solve(model.F, model.U)[0]
+
+    checks = []
+    for description, solve in (('settlement (iterative)', lambda: iterative.solve_iterative(model, preconditioner='ic', tol=1e-12)),
+                               ('settlement (mixed)', lambda: precision.solve_mixed(model))):
+        error = float(np.abs(solve()[0] - q).max() / np.abs(q).max())
+        checks.append({'check': description, 'expected': 0.0, 'computed': error, 'rel_error': error,
+                       'ok': bool(error <= rtol)})
+    return checks
+
+
+def _meta():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'date': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'numpy': np.__version__, 'scipy': scipy.__version__,
+            'machine': platform.machine(), 'platform': platform.platform()}
+
+
+def _report(result):
+    checks = 'ok' if all(c['ok'] for c in result['checks']) else \
+             'FAILED ' + ', '.join(c['check'] for c in result['checks'] if not c['ok'])
+    slowest = max((p for p in result['phases'] if p != 'geometry'), key=result['phases'].get)
+    print(f"{result['family']:8s} {result['members']:>9d} members {result['dofs']:>9d} dofs "
+          f"{result['total']:9.4f} s  (slowest: {slowest} {result['phases'][slowest]:.4f} s)  checks {checks}")
+
+
+# Phase-by-phase ratio new / old for the cases present in both runs; phases faster than `floor` seconds in
+# both runs are too noisy to judge. Returns the list of regressions (ratio above `threshold`).
+def compare(old, new, threshold=1.25, floor=1e-3):
+    before = {(r['family'], r['target_members']): r for r in old['results']}
+    regressions = []
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    for r in new['results']:
+        base = before.get((r['family'], r['target_members']))
+        if base is None or 'error' in base or 'error' in r:
+            continue
+        ratios = {p: r['phases'][p] / base['phases'][p] for p in PHASES
+                  if max(r['phases'][p], base['phases'][p]) >= floor and base['phases'][p] > 0}
+        total  = r['total'] / base['total']
+        worse  = {p: x for p, x in ratios.items() if x > threshold}
+        print(f"{r['family']:8s} {r['members']:>9d} members  total x{total:.2f}" +
+              ''.join(f"  {p} x{x:.2f}" for p, x in worse.items()))
+        regressions += [(r['family'], r['members'], p, x) for p, x in worse.items()]
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the truss solver on generated truss families.')
+    parser.add_argument('-f', '--families', nargs='+', choices=sorted(generators.FAMILIES), default=sorted(generators.FAMILIES))
+    parser.add_argument('-s', '--sizes', nargs='+', type=int, default=SIZES, help='approximate member counts')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='timing runs per case (the best is kept)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('-o', '--output', help='write the results as JSON')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            regressions = compare(json.load(f), json.load(g), args.threshold)
+        print(f"{len(regressions)} regression(s)")
+        return 1 if regressions else 0
+
+    results = []
+    for family in args.families:
+        for members in args.sizes:
+            try:
+                results.append(run_case(family, members, args.repeat, not args.no_memory))
+                _report(results[-1])
+            except (MemoryError, np.linalg.LinAlgError) as e:
+                results.append({'family': family, 'target_members': members, 'error': str(e) or type(e).__name__})
+                print(f"{family:8s} {members:>9d} members  failed: {results[-1]['error']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': _meta(), 'results': results}, f, indent=1)
+    return 0 if all('error' not in r and all(c['ok'] for c in r['checks']) for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+import numpy as np
+import scipy.sparse as sp
+from instrument import NULL
+from truss2D import TrussAnalysis
+
+
+# Stable content hash of a sequence of arrays (shape and dtype included), as 32 hex digits
+def array_key(*arrays):
+    h = hashlib.blake2b(digest_size=16)
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.dtype.str}{a.shape};".encode())
+        h.update(a.data if a.size else b'')
+    return h.hexdigest()
+
+
+# Hash of everything that determines K and the factorization of Kff: geometry, connectivity, E, A, the
+# fixities and the solver. Loads and prescribed displacement values are not part of it.
+def model_key(model, solver='sparse'):
+    return array_key(model.coord, model.lnods, model.young, model.csarea, model.fixity,
+                     np.frombuffer(solver.encode(), dtype=np.uint8))
+
+
+# Hash of the right-hand side: point loads and prescribed displacement values
+def load_key(model):
+    return array_key(model.loads, model.prescribed)
+
+
+# Bytes held by arrays, sparse matrices, factorizations (nbytes) and tuples / lists / dicts of them
+def nbytes(value):
+    if sp.issparse(value):
+        value = value.tocsr() if value.format not in ('csr', 'csc') else value
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if isinstance(value, TrussAnalysis):
+        return nbytes((value.K, value.Kff, value.Kfp)) + value.factor.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    return getattr(value, 'nbytes', 0)
+
+
+# Independent copy of arrays, sparse matrices and tuples / lists / dicts of them (other values are shared)
+def copy(value):
+    if sp.issparse(value) or isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, (tuple, list)):
+        return type(value)(copy(v) for v in value)
+    if isinstance(value, dict):
+        return {k: copy(v) for k, v in value.items()}
+    return value
+
+
+# Content-addressed cache of prepared analyses (assembled K and the factorization of Kff), keyed by
+# model_key, and of solutions, keyed by model_key and load_key. Both kinds share one in-memory LRU bounded
+# by `max_bytes`; an entry bigger than the whole budget is not kept in memory. With a `directory`, every
+# new analysis is also written there (K and, when it can be pickled, the factor; SuperLU factors cannot
+# be, so they are refactored on load), which lets later processes and batch runs skip the assembly.
+# The directory grows without bound and holds pickles, so it must be private to the user.
+#   analysis(model)  TrussAnalysis from memory, from disk or built (and stored)
+#   solve(model)     (analysis, (q, R, stresses)) from the solution cache or solved with the analysis
+#   result(model) / store_result(model, value)  any other per-solution value, e.g. the GUI's results
+# Solutions are stored and handed out as copies, so a caller writing into its arrays cannot change the
+# cache; the analysis itself is shared, and its K and factorization must not be modified.
+# `stats` counts hits and misses per tier, evictions, entries and bytes held.
+class AnalysisCache:
+
+    def __init__(self, max_bytes=512 * 2**20, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries   = OrderedDict()                                 # key -> (value, nbytes), oldest first
+        self.bytes     = 0
+        self.counts    = dict.fromkeys(('analysis_hits', 'analysis_misses', 'disk_hits', 'disk_misses',
+                                        'result_hits', 'result_misses', 'evictions'), 0)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def stats(self):
+        return dict(self.counts, entries=len(self.entries), bytes=self.bytes)
+
+    def _get(self, key):
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key][0]
+
+    def _put(self, key, value):
+        size = nbytes(value)
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            self.counts['evictions'] += 1
+
+    def analysis(self, model, solver='sparse', progress=None, instrument=None):
+        ins = instrument or NULL
+        key = ('analysis', model_key(model, solver))
+        analysis = self._get(key)
+        if analysis is not None:
+            self.counts['analysis_hits'] += 1
+            analysis.model = model                                     # Same structure, maybe new loads
+        else:
+            self.counts['analysis_misses'] += 1
+            with ins.phase('cache'):
+                stored = self._load(key[1])
+            analysis = TrussAnalysis(model, solver=solver, progress=progress, instrument=instrument, **stored)
+            if not stored:
+                self._save(key[1], analysis)
+            self._put(key, analysis)
+        analysis.progress   = progress or (lambda phase: None)
+        analysis.instrument = ins
+        return analysis
+
+    def solve(self, model, solver='sparse', progress=None, instrument=None):
+        analysis = self.analysis(model, solver, progress, instrument)
+        key = ('result', model_key(model, solver), load_key(model))
+        result = self._get(key)
+        if result is not None:
+            self.counts['result_hits'] += 1
+        else:
+            self.counts['result_misses'] += 1
+            result = analysis.solve(model.F, model.U)
+            self._put(key, copy(result))
+        return analysis, copy(result)
+
+    def result(self, model, solver='sparse'):
+        result = self._get(('result', model_key(model, solver), load_key(model)))
+        self.counts['result_hits' if result is not None else 'result_misses'] += 1
+        return copy(result)
+
+    def store_result(self, model, value, solver='sparse'):
+        self._put(('result', model_key(model, solver), load_key(model)), copy(value))
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    # {'K': ..., 'factor': ...} from the disk tier (factor may be None), or {} on a miss
+    def _load(self, key):
+        if not self.directory:
+            return {}
+        try:
+            with open(self._path(key), 'rb') as f:
+                stored = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.counts['disk_misses'] += 1
+            return {}
+        self.counts['disk_hits'] += 1
+        os.utime(self._path(key))                                     # Last use, for pruning by age
+        return stored
+
+    def _save(self, key, analysis):
+        if not self.directory:
+            return
+        try:
+            data = pickle.dumps({'K': analysis.K, 'factor': analysis.factor}, protocol=pickle.HIGHEST_PROTOCOL)
+        except (TypeError, pickle.PicklingError):
+            data = pickle.dumps({'K': analysis.K, 'factor': None}, protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))                          # Atomic: readers never see half a file
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
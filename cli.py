@@ -0,0 +1,95 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import model_io
+import truss2D as tc
+from cache import AnalysisCache
+
+
+# Headless entry point: solve one or many model files without tkinter or matplotlib.
+#   python cli.py bridge.json
+#   python cli.py models/ "runs/*.json" -o results/ --jobs 8
+# A directory that holds nodes.csv is a single CSV model; any other directory is searched for *.json
+# models and CSV model sub-directories. Each model writes <name>.results.json.
+# --cache DIR keeps assembled stiffness matrices and factorizations in DIR, so resubmitted structures
+# (same geometry, members and supports, whatever the loads) skip assembly and factorization.
+
+
+def find_models(patterns):
+    models = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.isdir(path) and not model_io.is_model_dir(path):
+                models += sorted(glob.glob(os.path.join(path, '*.json')))
+                models += sorted(p for p in glob.glob(os.path.join(path, '*')) if model_io.is_model_dir(p))
+            else:
+                models.append(path)
+    return [m for m in models if not m.endswith('.results.json')]
+
+
+_caches = {}                                                      # Per process, by cache directory
+
+
+def solve_model(path, output_dir, solver, cache_dir=None):
+    start = time.perf_counter()
+    try:
+        coords, elements, prescribed, point_load = model_io.read_model(path)
+        if cache_dir and cache_dir not in _caches:
+            _caches[cache_dir] = AnalysisCache(directory=cache_dir)
+        cache = _caches.get(cache_dir)
+        _, q, R, stresses = tc.truss2D(coords, elements, prescribed, point_load, solver=solver, cache=cache)
+
+        name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+        out  = os.path.join(output_dir or os.path.dirname(os.path.normpath(path)) or '.', name + '.results.json')
+        model_io.write_results(out, q, R, stresses)
+        return path, len(coords), len(elements), time.perf_counter() - start, None
+
+    except (OSError, ValueError, KeyError, IndexError, np.linalg.LinAlgError) as e:
+        return path, 0, 0, time.perf_counter() - start, str(e) or type(e).__name__
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve 2D truss models without the GUI.')
+    parser.add_argument('models', nargs='+', help='model files (.json), CSV model directories, directories or glob patterns')
+    parser.add_argument('-o', '--output-dir', help='directory for the result files (default: next to each model)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='parallel worker processes (default: one per CPU)')
+    parser.add_argument('--solver', choices=['sparse', 'dense', 'banded', 'splu'], default='sparse')
+    parser.add_argument('--cache', metavar='DIR', help='reuse stiffness matrices and factorizations stored in DIR')
+    args = parser.parse_args(argv)
+
+    models = find_models(args.models)
+    if not models:
+        parser.error('no models found')
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    if len(models) == 1 or args.jobs == 1:
+        results = (solve_model(m, args.output_dir, args.solver, args.cache) for m in models)
+        failures = _report(results)
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures  = [pool.submit(solve_model, m, args.output_dir, args.solver, args.cache) for m in models]
+            failures = _report(f.result() for f in futures)
+
+    print(f"{len(models)} model(s), {failures} failed, {time.perf_counter() - start:.3f} s total")
+    return 1 if failures else 0
+
+
+def _report(results):
+    failures = 0
+    for path, nnode, nelem, elapsed, error in results:
+        if error is None:
+            print(f"{path}: {nnode} nodes, {nelem} elements, {elapsed:.3f} s")
+        else:
+            failures += 1
+            print(f"{path}: FAILED ({error}) after {elapsed:.3f} s", file=sys.stderr)
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+from collections import namedtuple
+import numpy as np
+from scipy.spatial import cKDTree
+import solver as sv
+from truss2D import TrussModel, element_stiffness, assemble_stiffness, prescribed_array
+
+
+# One finding of the pre-solve check. severity is 'error' (the model cannot be solved) or 'warning';
+# nodes and elements are the 1-based numbers at fault.
+Issue = namedtuple('Issue', ['severity', 'kind', 'message', 'nodes', 'elements'])
+
+
+def _numbers(indices, limit=10):
+    text = ', '.join(str(i + 1) for i in indices[:limit])
+    return text + (f" (+{len(indices) - limit} more)" if len(indices) > limit else '')
+
+
+# Connected components of the node graph by array union-find: every edge hooks the larger of its two
+# roots onto the smaller one, then pointer jumping flattens the trees; repeated until no edge spans two roots.
+# Returns the root (smallest node index) of every node's component.
+def connected_components(nnode, lnods):
+    parent = np.arange(nnode)
+    while True:
+        ru, rv  = parent[lnods[:, 0]], parent[lnods[:, 1]]
+        spans   = ru != rv
+        if not spans.any():
+            return parent
+        np.minimum.at(parent, np.maximum(ru, rv)[spans], np.minimum(ru, rv)[spans])
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+
+# Pre-solve model check on the GUI entry lists, in O(n log n) and before any assembly:
+#   dangling node references, invalid E / A, zero-length and duplicated elements, coincident nodes
+#   (KD-tree within `tol`, default 1e-9 of the model size), unconnected nodes and disconnected parts,
+#   parts without supports, supports that leave a rigid-body mode free (rank check of the restraints),
+#   parts with too few members (Maxwell count) and nodes with no stiffness in a free direction.
+#   factorize=True adds a factorization of Kff, when nothing else is wrong, which also finds internal
+#   mechanisms and names the first unstable node. Returns a list of Issue records (empty when fine).
+def diagnose(coords_entries, elements_entries, prescribed_entries=(), point_load_entries=(), tol=None, factorize=False):
+    issues   = []
+    coord    = np.array(coords_entries, dtype=float).reshape(-1, 2)
+    elements = np.array(elements_entries, dtype=float).reshape(-1, 4)
+    nnode    = len(coord)
+
+    if nnode == 0 or len(elements) == 0:
+        return [Issue('error', 'empty', "The model needs at least one node and one element.", [], [])]
+
+    # Dangling references
+    lnods    = elements[:, :2] - 1
+    dangling = np.any((lnods < 0) | (lnods >= nnode) | (lnods != np.round(lnods)), axis=1)
+    if dangling.any():
+        bad = np.flatnonzero(dangling)
+        issues.append(Issue('error', 'dangling', f"Element(s) {_numbers(bad)} refer to nodes outside 1 to {nnode}.",
+                            [], (bad + 1).tolist()))
+    for what, entries in (('Prescribed displacement', prescribed_entries), ('Point load', point_load_entries)):
+        nodes = np.array([row[0] for row in entries], dtype=float)
+        bad   = nodes[(nodes < 1) | (nodes > nnode) | (nodes != np.round(nodes))]
+        if len(bad):
+            issues.append(Issue('error', 'dangling', f"{what} refers to node(s) {', '.join(f'{n:g}' for n in bad[:10])}, "
+                                f"but nodes are numbered 1 to {nnode}.", [], []))
+
+    valid = np.flatnonzero(~dangling)
+    lnods = lnods[valid].astype(int)
+
+    # Material and section properties
+    bad = valid[~(elements[valid, 2] > 0) | ~(elements[valid, 3] > 0)]
+    if len(bad):
+        issues.append(Issue('error', 'property', f"Element(s) {_numbers(bad)} need a positive E and A.", [], (bad + 1).tolist()))
+
+    # Coincident nodes
+    size = np.ptp(coord, axis=0).max() if nnode > 1 else 0.0
+    tol  = 1e-9 * (size or 1.0) if tol is None else tol
+    pairs = cKDTree(coord).query_pairs(tol, output_type='ndarray')
+    if len(pairs):
+        nodes = np.unique(pairs)
+        issues.append(Issue('warning', 'coincident', f"Node(s) {_numbers(nodes)} share coordinates with another node.",
+                            (nodes + 1).tolist(), []))
+
+    # Zero-length and duplicated elements
+    length = np.hypot(*(coord[lnods[:, 1]] - coord[lnods[:, 0]]).T)
+    zero   = length <= tol
+    if zero.any():
+        issues.append(Issue('error', 'zero_length', f"Element(s) {_numbers(valid[zero])} have zero length.",
+                            (np.unique(lnods[zero]) + 1).tolist(), (valid[zero] + 1).tolist()))
+
+    _, pair_id, counts = np.unique(lnods.min(axis=1) * nnode + lnods.max(axis=1), return_inverse=True, return_counts=True)
+    repeated = np.flatnonzero(counts[pair_id] > 1)
+    if len(repeated):
+        issues.append(Issue('warning', 'duplicate', f"Element(s) {_numbers(valid[repeated])} connect the same pair of nodes.",
+                            [], (valid[repeated] + 1).tolist()))
+
+    # Connectivity: unconnected nodes and disconnected parts
+    root    = connected_components(nnode, lnods)
+    used    = np.zeros(nnode, dtype=bool)
+    used[lnods.ravel()] = True
+    if (~used).any():
+        issues.append(Issue('error', 'unconnected', f"Node(s) {_numbers(np.flatnonzero(~used))} are not connected to any element.",
+                            (np.flatnonzero(~used) + 1).tolist(), []))
+
+    fixity = np.zeros((nnode, 2), dtype=bool)
+    prescribed = prescribed_array(prescribed_entries)
+    inside = (prescribed[:, 0] >= 1) & (prescribed[:, 0] <= nnode)
+    np.logical_or.at(fixity, prescribed[inside, 0].astype(int) - 1, prescribed[inside, 1:3] != 0)
+
+    parts = np.unique(root[used])
+    if len(parts) > 1:
+        issues.append(Issue('warning', 'disconnected', f"The truss has {len(parts)} separate parts.", [], []))
+
+    # Per part, from counts over the component roots: a part needs supports, its restraints must stop the
+    # three rigid-body modes (rank of the restraint rows of [u, v, rotation] = 3, so at least 3 of them),
+    # and the Maxwell count m + r >= 2n is necessary for stability. The rank is only computed for parts
+    # that pass the counts, batched over parts with the same number of restraints.
+    element_part = root[lnods[:, 0]]
+    n = np.bincount(root[used], minlength=nnode)[parts]
+    m = np.bincount(element_part, minlength=nnode)[parts]
+    r = np.bincount(root[used], weights=fixity[used].sum(axis=1), minlength=nnode)[parts].astype(int)
+    unsupported = parts[r == 0]
+    rigid       = [parts[(r > 0) & (r < 3)]]
+    mechanism   = parts[(r >= 3) & (m + r < 2 * n)]
+    counted     = (r >= 3) & (m + r >= 2 * n)
+
+    # Rotations are taken about each part's root node, so that parts far from the origin are not
+    # judged on ill-conditioned rows
+    fx, fy = np.flatnonzero(used & fixity[:, 0]), np.flatnonzero(used & fixity[:, 1])
+    rows   = np.r_[np.c_[np.ones(len(fx)), np.zeros(len(fx)), coord[root[fx], 1] - coord[fx, 1]],
+                   np.c_[np.zeros(len(fy)), np.ones(len(fy)), coord[fy, 0] - coord[root[fy], 0]]]
+    owner  = root[np.r_[fx, fy]]
+    keep   = np.flatnonzero(np.isin(owner, parts[counted]))
+    keep   = keep[np.argsort(owner[keep], kind='stable')]
+    ids, starts, sizes = np.unique(owner[keep], return_index=True, return_counts=True)
+    for k in np.unique(sizes):
+        block = rows[keep[starts[sizes == k][:, None] + np.arange(k)]]          # (parts, k, 3)
+        rigid.append(ids[sizes == k][np.linalg.matrix_rank(block, tol=1e-9 * max(size, 1.0)) < 3])
+    rigid = np.concatenate(rigid)
+
+    if len(unsupported):
+        nodes = np.flatnonzero(used & np.isin(root, unsupported))
+        issues.append(Issue('error', 'unsupported', f"{len(unsupported)} part(s) of the truss have no supports: "
+                            f"node(s) {_numbers(nodes)}.", (nodes + 1).tolist(), []))
+    if len(rigid):
+        nodes = np.union1d(fx, fy)
+        nodes = nodes[np.isin(root[nodes], rigid)]
+        issues.append(Issue('error', 'rigid_body', f"The supports of {len(rigid)} part(s) do not prevent "
+                            f"rigid-body motion (too few, parallel or concurrent restraints) at node(s) {_numbers(nodes)}.",
+                            (nodes + 1).tolist(), []))
+    if len(mechanism):
+        nodes = np.flatnonzero(used & np.isin(root, mechanism))
+        bad   = np.isin(parts, mechanism)
+        count = (f"{m[bad][0]} members + {r[bad][0]} restraints < {2 * n[bad][0]} DOFs" if len(mechanism) == 1
+                 else "members + restraints < 2 x nodes")
+        issues.append(Issue('error', 'mechanism', f"{len(mechanism)} part(s) of the truss are mechanisms ({count}): "
+                            f"node(s) {_numbers(nodes)}.", (nodes + 1).tolist(), []))
+
+    # Nodes whose members give no stiffness in a free direction (e.g. all members collinear)
+    if not zero.any():
+        c, s = (coord[lnods[:, 1]] - coord[lnods[:, 0]]).T / length
+        stiff = np.zeros((nnode, 3))
+        for end in (0, 1):
+            np.add.at(stiff, lnods[:, end], np.stack([c * c, c * s, s * s], axis=1))
+        kxx, kxy, kyy = stiff.T
+        free_x, free_y = ~fixity[:, 0], ~fixity[:, 1]
+        det   = kxx * kyy - kxy ** 2
+        weak  = used & ((free_x & free_y & (det <= 1e-12 * (kxx + kyy) ** 2)) |
+                        (free_x & ~free_y & (kxx <= 1e-12)) | (~free_x & free_y & (kyy <= 1e-12)))
+        if weak.any():
+            issues.append(Issue('error', 'mechanism', f"Node(s) {_numbers(np.flatnonzero(weak))} have no stiffness in a "
+                                f"free direction (e.g. all members at the node are collinear).",
+                                (np.flatnonzero(weak) + 1).tolist(), []))
+
+    # Optional exact check: factor Kff; the first zero pivot names an unstable node
+    if factorize and not any(issue.severity == 'error' for issue in issues):
+        model  = TrussModel.from_entries(coords_entries, elements_entries, prescribed_entries)
+        K      = assemble_stiffness(model.ngdof, model.lnods,
+                                    element_stiffness(model.young, model.csarea, model.elength, model.ecos, model.esin))
+        free   = model.free_dofs
+        try:
+            perm = sv.dof_order(sv.rcm_node_order(model.lnods, model.nnode), free)
+            sv.factorize(K[free][:, free], perm=perm, dofs=free)
+        except sv.NotPositiveDefinite as e:
+            issues.append(Issue('error', 'mechanism', str(e), [e.dof // 2 + 1], []))
+        except np.linalg.LinAlgError as e:
+            issues.append(Issue('error', 'mechanism', str(e), [], []))
+
+    return issues
@@ -0,0 +1,101 @@
+import numpy as np
+import scipy.linalg as sl
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from truss2D import assemble_stiffness, recover_elements
+
+
+# Lumped mass matrix (diagonal, ngdof x ngdof): half of each member's mass rho A L goes to each end node,
+# in both directions. `density` is a scalar or one value per element.
+def lumped_mass(model, density=7850.0):
+    m = np.broadcast_to(density, (model.nelem,)) * model.csarea * model.elength / 2
+    nodal = np.bincount(model.lnods.ravel(), weights=np.repeat(m, 2), minlength=model.nnode)
+    return sp.diags(np.repeat(nodal, 2)).tocsr()
+
+
+# Consistent mass matrix of the bar elements with translational inertia in both directions:
+# me = rho A L / 6 [[2 I, I], [I, 2 I]] (I the 2 x 2 identity), which is the same in every orientation
+def consistent_mass(model, density=7850.0):
+    m  = np.broadcast_to(density, (model.nelem,)) * model.csarea * model.elength / 6
+    me = np.kron([[2.0, 1.0], [1.0, 2.0]], np.eye(2))
+    return assemble_stiffness(model.ngdof, model.lnods, m[:, None, None] * me)
+
+
+def mass_matrix(model, density=7850.0, lumped=True):
+    return lumped_mass(model, density) if lumped else consistent_mass(model, density)
+
+
+# Geometric stiffness for axial member forces N (tension positive, one per element):
+# kg = N / L * t t^T with t = [s, -c, -s, c], the relative transverse displacement of the two ends
+def geometric_stiffness(model, force):
+    t = np.stack([model.esin, -model.ecos, -model.esin, model.ecos], axis=1)
+    k = np.asarray(force, dtype=float) / model.elength
+    return assemble_stiffness(model.ngdof, model.lnods, k[:, None, None] * t[:, :, None] * t[:, None, :])
+
+
+# Full-size mode shapes from the free-DOF eigenvectors (zero at the supports)
+def _expand(analysis, vectors):
+    modes = np.zeros((analysis.ngdof, vectors.shape[1]))
+    modes[analysis.free_dofs] = vectors
+    return modes
+
+
+# Small problems, or k close to the number of free DOFs, go to LAPACK instead of ARPACK
+def _dense(n, k):
+    return n <= max(100, 2 * k + 1)
+
+
+# The k lowest natural frequencies (Hz) and mass-normalized mode shapes (ngdof, k) of a prepared
+# truss2D.TrussAnalysis. Lanczos (ARPACK) runs in shift-invert mode: with sigma=None the shift is zero and
+# the analysis' existing factorization of Kff is the inverse operator, so nothing is refactored; another
+# sigma (rad^2/s^2) targets the modes around it and factors Kff - sigma Mff once.
+def natural_modes(analysis, k=10, density=7850.0, lumped=True, sigma=None, tol=0):
+    free = analysis.free_dofs
+    Kff  = analysis.Kff
+    Mff  = mass_matrix(analysis.model, density, lumped)[free][:, free]
+    k    = min(k, len(free))
+
+    if _dense(len(free), k):
+        w2, vectors = sl.eigh(Kff.toarray(), Mff.toarray(), subset_by_index=[0, k - 1])
+    else:
+        if sigma is None:
+            shift, solve = 0.0, analysis.factor.solve
+        else:
+            shift = float(sigma)
+            solve = spla.splu(sp.csc_matrix(Kff - shift * Mff), permc_spec='MMD_AT_PLUS_A').solve
+        inverse = spla.LinearOperator(Kff.shape, matvec=solve, dtype=float)
+        w2, vectors = spla.eigsh(Kff, k, M=Mff, sigma=shift, which='LM', OPinv=inverse, tol=tol)
+        order = np.argsort(w2)
+        w2, vectors = w2[order], vectors[:, order]
+
+    return np.sqrt(np.maximum(w2, 0.0)) / (2 * np.pi), _expand(analysis, vectors)
+
+
+# The k lowest linear buckling load factors and mode shapes (ngdof, k) for the reference load F (default:
+# the model's loads and prescribed displacements). The member forces N of the reference solution give
+# Kg, and (K + lambda Kg) phi = 0 is solved as -Kg phi = (1 / lambda) K phi: its largest eigenvalues are the
+# smallest load factors, and K^-1 is applied with the analysis' factorization. Modes with no positive load
+# factor (members not in compression) are dropped, so fewer than k may come back.
+def buckling_modes(analysis, k=5, F=None, tol=0):
+    model = analysis.model
+    if F is None:
+        q = analysis.solve(model.F, model.U)[0]
+    else:
+        q = analysis.solve(F)[0]
+    force = recover_elements(model, q)['force']
+
+    free = analysis.free_dofs
+    Kgff = geometric_stiffness(model, force)[free][:, free]
+    k    = min(k, len(free))
+
+    if _dense(len(free), k):
+        theta, vectors = sl.eigh(-Kgff.toarray(), analysis.Kff.toarray())
+        theta, vectors = theta[::-1][:k], vectors[:, ::-1][:, :k]
+    else:
+        inverse = spla.LinearOperator(Kgff.shape, matvec=analysis.factor.solve, dtype=float)
+        theta, vectors = spla.eigsh(-Kgff, k, M=analysis.Kff, Minv=inverse, which='LA', tol=tol)
+        order = np.argsort(theta)[::-1]
+        theta, vectors = theta[order], vectors[:, order]
+
+    positive = theta > 1e-12 * max(np.abs(theta).max(initial=0.0), 1e-300)
+    return 1.0 / theta[positive], _expand(analysis, vectors[:, positive])
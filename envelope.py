@@ -0,0 +1,50 @@
+import numpy as np
+
+
+# Running max/min of a (nrow, ncol) block of combination results, keeping the governing row index
+def _update(env, key, block, offset):
+    imax = np.argmax(block, axis=0)
+    imin = np.argmin(block, axis=0)
+    vmax = block[imax, np.arange(block.shape[1])]
+    vmin = block[imin, np.arange(block.shape[1])]
+
+    if key + '_max' not in env:
+        env[key + '_max'], env[key + '_max_combo'] = vmax, imax + offset
+        env[key + '_min'], env[key + '_min_combo'] = vmin, imin + offset
+        return
+
+    better = vmax > env[key + '_max']
+    env[key + '_max'][better]       = vmax[better]
+    env[key + '_max_combo'][better] = imax[better] + offset
+
+    better = vmin < env[key + '_min']
+    env[key + '_min'][better]       = vmin[better]
+    env[key + '_min_combo'][better] = imin[better] + offset
+
+
+# Envelope of member stresses and support reactions over load combinations by linear superposition.
+# F holds the basic load cases (ngdof, ncase) and `factors` the combination table (ncombo, ncase), where
+# row c gives the factor applied to each basic case in combination c. The basic cases are solved once
+# with `analysis` (a truss2D.TrussAnalysis); the combinations are formed `chunk` rows at a time as matrix
+# products, so only the running envelope is kept. Returns a dict with
+#   stress_max, stress_min, stress_max_combo, stress_min_combo               per element
+#   reaction_max, reaction_min, reaction_max_combo, reaction_min_combo       per support DOF
+#   reaction_dofs                                                            the support DOF numbers (0-based)
+def load_envelope(analysis, F, factors, chunk=1024):
+    factors = np.atleast_2d(np.asarray(factors, dtype=float))
+    F       = np.asarray(F, dtype=float).reshape(analysis.ngdof, -1)
+
+    if factors.shape[1] != F.shape[1]:
+        raise ValueError(f"Combination table has {factors.shape[1]} columns but there are {F.shape[1]} basic load cases.")
+
+    _, R, stresses = analysis.solve(F)
+    reactions = R[analysis.fixed_dofs]
+
+    env = {'reaction_dofs': analysis.fixed_dofs}
+    for start in range(0, len(factors), chunk):
+        block = factors[start:start + chunk]
+        _update(env, 'stress', block @ stresses.T, start)
+        if len(reactions):
+            _update(env, 'reaction', block @ reactions.T, start)
+
+    return env
@@ -0,0 +1,164 @@
+from collections import namedtuple
+import numpy as np
+
+
+# A generated truss as the 1-based entry tables of the GUI (arrays: coords (n, 2), elements (m, 4) as
+# n1, n2, E, A, prescribed and point_load (k, 3)) plus closed-form checks. Each check is a tuple
+# (description, kind, index, value): kind 'reaction' sums R over the 0-based global DOFs `index`,
+# kind 'stress' is the stress of the 0-based element `index`.
+Truss = namedtuple('Truss', ['name', 'coords', 'elements', 'prescribed', 'point_load', 'expected'])
+
+
+def _truss(name, coords, members, supports, loads, young, csarea, expected):
+    members  = np.asarray(members, dtype=float).reshape(-1, 2) + 1
+    elements = np.c_[members, np.full(len(members), young), np.full(len(members), csarea)]
+    return Truss(name, np.asarray(coords, dtype=float), elements, np.asarray(supports, dtype=float).reshape(-1, 3),
+                 np.asarray(loads, dtype=float).reshape(-1, 3), expected)
+
+
+# Unit panel width and a span/depth ratio of 10 unless given; a realistic depth keeps very long spans
+# well conditioned (a 250,000-panel truss 1 unit deep would not be)
+def _dimensions(panels, span, height):
+    span = float(panels if span is None else span)
+    return span, span / 10 if height is None else float(height)
+
+
+# Simply supported span of `panels` panels (even) with bottom chord nodes 0..panels, pinned at the left
+# end, on a roller at the right end and loaded by P downwards at midspan. The reactions are P/2, and
+# the midspan moment is M = P L / 4.
+def _span(panels, span):
+    if panels < 2 or panels % 2:
+        raise ValueError("The number of panels must be even and at least 2.")
+    a = span / panels
+    return a, np.c_[np.arange(panels + 1) * a, np.zeros(panels + 1)]
+
+
+def _span_checks(panels, load):
+    return [('left reaction', 'reaction', [1], load / 2), ('right reaction', 'reaction', [2 * panels + 1], load / 2)]
+
+
+def _span_bcs(panels, load):
+    supports = [(1, 1, 1), (panels + 1, 0, 1)]
+    loads    = [(panels // 2 + 1, 0.0, -load)]
+    return supports, loads
+
+
+# Pratt truss: verticals, diagonals in tension under gravity (sloping down towards midspan), end
+# diagonals from the supports. The top chord at midspan carries -M/h.
+def pratt(panels, span=None, height=None, young=200e9, csarea=0.01, load=1000.0):
+    span, height = _dimensions(panels, span, height)
+    a, bottom = _span(panels, span)
+    top = np.c_[np.arange(1, panels) * a, np.full(panels - 1, height)]            # Top node i sits above bottom node i
+    T   = lambda i: panels + i                                                    # Index of the top node above bottom node i
+    half = panels // 2
+
+    members  = [(i, i + 1) for i in range(panels)]                               # Bottom chord
+    centre   = len(members) + half - 2                                            # Top chord member (half-1, half)
+    members += [(T(i), T(i + 1)) for i in range(1, panels - 1)]                   # Top chord
+    members += [(i, T(i)) for i in range(1, panels)]                              # Verticals
+    members += [(0, T(1)), (panels, T(panels - 1))]                               # End diagonals
+    members += [(T(i), i + 1) for i in range(1, half)]                            # Diagonals, left half
+    members += [(T(i + 1), i) for i in range(half, panels - 1)]                   # Diagonals, right half
+
+    supports, loads = _span_bcs(panels, load)
+    expected = _span_checks(panels, load)
+    if panels >= 4:
+        expected.append(('top chord at midspan (-M/h)', 'stress', centre, -load * span / 4 / height / csarea))
+    return _truss('pratt', np.r_[bottom, top], members, supports, loads, young, csarea, expected)
+
+
+# Howe truss: as the Pratt truss with the diagonals mirrored (in compression under gravity).
+# The bottom chord at midspan carries M/h.
+def howe(panels, span=None, height=None, young=200e9, csarea=0.01, load=1000.0):
+    span, height = _dimensions(panels, span, height)
+    a, bottom = _span(panels, span)
+    top = np.c_[np.arange(1, panels) * a, np.full(panels - 1, height)]
+    T   = lambda i: panels + i
+    half = panels // 2
+
+    members  = [(i, i + 1) for i in range(panels)]
+    centre   = half - 1                                                           # Bottom chord member (half-1, half)
+    members += [(T(i), T(i + 1)) for i in range(1, panels - 1)]
+    members += [(i, T(i)) for i in range(1, panels)]
+    members += [(0, T(1)), (panels, T(panels - 1))]
+    members += [(i, T(i + 1)) for i in range(1, half)]
+    members += [(i + 1, T(i)) for i in range(half, panels - 1)]
+
+    supports, loads = _span_bcs(panels, load)
+    expected = _span_checks(panels, load)
+    if panels >= 4:
+        expected.append(('bottom chord at midspan (M/h)', 'stress', centre, load * span / 4 / height / csarea))
+    return _truss('howe', np.r_[bottom, top], members, supports, loads, young, csarea, expected)
+
+
+# Warren truss: no verticals, top nodes above the panel centres and alternating diagonals.
+# The top chord member over midspan carries -M/h.
+def warren(panels, span=None, height=None, young=200e9, csarea=0.01, load=1000.0):
+    span, height = _dimensions(panels, span, height)
+    a, bottom = _span(panels, span)
+    top = np.c_[(np.arange(panels) + 0.5) * a, np.full(panels, height)]
+    T   = lambda i: panels + 1 + i                                                # Top node over panel i
+    half = panels // 2
+
+    members  = [(i, i + 1) for i in range(panels)]
+    centre   = len(members) + half - 1                                            # Top chord member (half-1, half)
+    members += [(T(i), T(i + 1)) for i in range(panels - 1)]
+    members += [(i, T(i)) for i in range(panels)] + [(T(i), i + 1) for i in range(panels)]
+
+    supports, loads = _span_bcs(panels, load)
+    expected = _span_checks(panels, load) + [('top chord at midspan (-M/h)', 'stress', centre,
+                                              -load * span / 4 / height / csarea)]
+    return _truss('warren', np.r_[bottom, top], members, supports, loads, young, csarea, expected)
+
+
+# K-truss: every interior vertical is split at mid-height and the two half-diagonals of each panel meet
+# there, from the vertical on the side nearer midspan.
+def ktruss(panels, span=None, height=None, young=200e9, csarea=0.01, load=1000.0):
+    span, height = _dimensions(panels, span, height)
+    a, bottom = _span(panels, span)
+    top    = np.c_[np.arange(panels + 1) * a, np.full(panels + 1, height)]
+    middle = np.c_[np.arange(1, panels) * a, np.full(panels - 1, height / 2)]
+    T    = lambda i: panels + 1 + i
+    M    = lambda i: 2 * panels + 1 + i
+    half = panels // 2
+
+    members  = [(i, i + 1) for i in range(panels)] + [(T(i), T(i + 1)) for i in range(panels)]
+    members += [(0, T(0)), (panels, T(panels))]                                   # End verticals
+    members += [(i, M(i)) for i in range(1, panels)] + [(M(i), T(i)) for i in range(1, panels)]
+    members += [(M(i + 1), T(i)) for i in range(half)] + [(M(i + 1), i) for i in range(half)]
+    members += [(M(i), T(i + 1)) for i in range(half, panels)] + [(M(i), i + 1) for i in range(half, panels)]
+
+    supports, loads = _span_bcs(panels, load)
+    return _truss('ktruss', np.r_[bottom, top, middle], members, supports, loads, young, csarea,
+                  _span_checks(panels, load))
+
+
+# 2D lattice: a rows x cols grid of square cells with both diagonals, clamped along the left edge and
+# loaded by a total P downwards spread over the right edge. The vertical reactions sum to P.
+def lattice(rows, cols=None, spacing=1.0, young=200e9, csarea=0.01, load=1000.0):
+    cols = rows if cols is None else cols
+    x, y = np.meshgrid(np.arange(cols + 1) * spacing, np.arange(rows + 1) * spacing)
+    node = np.arange((rows + 1) * (cols + 1)).reshape(rows + 1, cols + 1)
+
+    members = np.r_[np.c_[node[:, :-1].ravel(), node[:, 1:].ravel()],
+                    np.c_[node[:-1].ravel(), node[1:].ravel()],
+                    np.c_[node[:-1, :-1].ravel(), node[1:, 1:].ravel()],
+                    np.c_[node[1:, :-1].ravel(), node[:-1, 1:].ravel()]]
+    left, right = node[:, 0], node[:, -1]
+    supports = np.c_[left + 1, np.ones(len(left)), np.ones(len(left))]
+    loads    = np.c_[right + 1, np.zeros(len(right)), np.full(len(right), -load / len(right))]
+
+    return _truss('lattice', np.c_[x.ravel(), y.ravel()], members, supports, loads, young, csarea,
+                  [('total vertical reaction', 'reaction', 2 * left + 1, load)])
+
+
+FAMILIES = {'pratt': pratt, 'howe': howe, 'warren': warren, 'ktruss': ktruss, 'lattice': lattice}
+_MEMBERS_PER_PANEL = {'pratt': 4, 'howe': 4, 'warren': 4, 'ktruss': 6}
+
+
+# A truss of `family` with about `members` members (the panel count or the grid size is rounded)
+def sized(family, members, **kwargs):
+    if family == 'lattice':
+        return lattice(max(1, int(round(np.sqrt(members / 4)))), **kwargs)
+    panels = max(2, 2 * int(round(members / _MEMBERS_PER_PANEL[family] / 2)))
+    return FAMILIES[family](panels, **kwargs)
@@ -0,0 +1,129 @@
+import time
+import numpy as np
+import solver as sv
+from instrument import NULL
+from iterative import pcg
+from truss2D import element_stiffness, element_dofs, assemble_stiffness, recover_elements, count_factor
+
+
+# Position of each of the 16 entries of every element matrix in K.data (K in canonical CSR form),
+# shape (nelem, 16), so element contributions can be removed and re-added without reassembly
+def stiffness_slots(K, lnods):
+    dofs = element_dofs(lnods).astype(np.int64)
+    rows = np.repeat(dofs, 4, axis=1)
+    cols = np.tile(dofs, (1, 4))
+    keys = np.repeat(np.arange(K.shape[0], dtype=np.int64), np.diff(K.indptr)) * K.shape[1] + K.indices
+    return np.searchsorted(keys, rows * K.shape[1] + cols)
+
+
+# Edit-and-resolve session for the GUI: solve(model) compares the new truss2D.TrussModel with the previous
+# one and only does the work the edit needs.
+#   same connectivity   the elements touching moved nodes or with a changed E / A are dirty; their old
+#                       contributions are subtracted from K.data and the new ones added in place
+#   loads only          solve with the existing factor (prescribed displacements count as loads: they enter
+#                       the right-hand side as F_f - Kfp U)
+#   a few dirty members PCG on the updated Kff, preconditioned by the previous factorization and warm-
+#                       started from the previous displacements (a handful of iterations); if it does not
+#                       converge in `maxiter` iterations the matrix is refactored
+#   otherwise           refactor (supports changed, more than `max_dirty` of the members changed since the
+#                       last factorization) or rebuild from scratch (nodes or connectivity changed)
+# Returns q, R, stresses and an info dict (method, dirty_nodes, dirty_elements, iterations, time).
+# `instrument` (instrument.Instrumentation) times the phases of each solve and counts the info entries (the
+# method as 'update') plus, after a factorization, ndof, nfree, nnz, the factorization method, bandwidth and fill.
+class IncrementalAnalysis:
+
+    def __init__(self, solver='sparse', max_dirty=0.25, tol=1e-10, maxiter=50):
+        self.method    = 'auto' if solver == 'sparse' else solver
+        self.max_dirty = max_dirty
+        self.tol       = tol
+        self.maxiter   = maxiter
+        self.model     = None
+
+    def solve(self, model, progress=None, instrument=None):
+        start    = time.perf_counter()
+        progress = progress or (lambda phase: None)
+        try:
+            return self._solve(model, progress, instrument or NULL, start)
+        except Exception:
+            self.model = None                                  # Start from scratch next time
+            raise
+
+    def _solve(self, model, progress, ins, start):
+        old = self.model
+        progress('assembly')
+        with ins.phase('assembly'):
+            if old is None or model.nnode != old.nnode or not np.array_equal(model.lnods, old.lnods):
+                self.ke    = element_stiffness(model.young, model.csarea, model.elength, model.ecos, model.esin)
+                self.K     = assemble_stiffness(model.ngdof, model.lnods, self.ke)
+                self.K.sort_indices()
+                self.slots = stiffness_slots(self.K, model.lnods)
+                self.stale = np.zeros(model.nelem, dtype=bool)
+                self.q     = np.zeros(model.ngdof)
+                moved, dirty, method = np.arange(model.nnode), np.arange(model.nelem), 'full'
+            else:
+                moved = np.flatnonzero(np.any(model.coord != old.coord, axis=1))
+                node_moved = np.zeros(model.nnode, dtype=bool)
+                node_moved[moved] = True
+                dirty = np.flatnonzero((model.young != old.young) | (model.csarea != old.csarea) |
+                                       node_moved[model.lnods].any(axis=1))
+                if len(dirty):
+                    ke = element_stiffness(model.young[dirty], model.csarea[dirty], model.elength[dirty],
+                                           model.ecos[dirty], model.esin[dirty])
+                    np.add.at(self.K.data, self.slots[dirty], (ke - self.ke[dirty]).reshape(len(dirty), 16))
+                    self.ke[dirty] = ke
+                    self.stale[dirty] = True
+                method = 'refactor' if (not np.array_equal(model.fixity, old.fixity) or
+                                        self.stale.sum() > self.max_dirty * model.nelem) else None
+
+        if method == 'full':
+            with ins.phase('ordering'):
+                self.order = sv.rcm_node_order(model.lnods, model.nnode)
+
+        self.model = model
+        free = model.free_dofs
+        fixed, U = model.fixed_dofs, model.U
+        with ins.phase('partition'):
+            Kf  = self.K[free]
+            Kff = Kf[:, free]
+            Ff  = model.F[free]
+            if U.any():
+                Ff -= Kf[:, fixed] @ U
+        iterations = 0
+
+        if method is None and not self.stale.any():
+            progress('solve')
+            with ins.phase('solve'):
+                u, method = self.factor.solve(Ff), 'reuse'
+        elif method is None:
+            progress('solve')
+            with ins.phase('solve'):
+                u, info = pcg(Kff, Ff, self.factor.solve, self.q[free], self.tol, self.maxiter)
+            iterations = info['iterations']
+            method = 'pcg' if info['converged'] else 'refactor'
+
+        if method in ('full', 'refactor'):
+            progress('factorization')
+            with ins.phase('factorization'):
+                self.factor = sv.factorize(Kff, perm=sv.dof_order(self.order, free), method=self.method, dofs=free)
+            self.stale[:] = False
+            count_factor(ins, model.ngdof, self.factor)
+            progress('solve')
+            with ins.phase('solve'):
+                u = self.factor.solve(Ff)
+
+        progress('recovery')
+        q = np.zeros(model.ngdof)
+        q[free]  = u
+        q[fixed] = U
+        self.q = q
+        with ins.phase('reactions'):
+            R = self.K @ q - model.F
+        with ins.phase('recovery'):
+            stresses = recover_elements(model, q)['stress']
+
+        info = {'method': method, 'dirty_nodes': len(moved), 'dirty_elements': len(dirty),
+                'iterations': iterations, 'time': time.perf_counter() - start}
+        ins.count('update', method)
+        for name in ('dirty_nodes', 'dirty_elements', 'iterations'):
+            ins.count(name, info[name])
+        return q, R, stresses, info
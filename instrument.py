@@ -0,0 +1,91 @@
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+# Opt-in instrumentation of a solve. Pass an Instrumentation as `instrument=` to truss2D, TrussAnalysis,
+# iterative.solve_iterative or incremental.IncrementalAnalysis.solve and every phase is timed; with
+# memory=True the peak of the memory traced by tracemalloc during each phase is recorded as well (numpy
+# and scipy arrays are traced, allocations inside SuperLU/LAPACK are not). Counters such as ndof, nnz,
+# fill and iterations are collected alongside. Every finished phase and every counter is also passed to
+# the hooks, as hook('phase', name, {'time': s, 'memory': bytes or None}) and hook('counter', name, value),
+# to forward them to an external metrics system. Phases are not nested; a repeated phase accumulates.
+class Instrumentation:
+
+    def __init__(self, memory=False, hooks=()):
+        self.memory   = memory
+        self.hooks    = list(hooks)
+        self.phases   = {}                                       # name -> {'time', 'memory', 'calls'}
+        self.counters = {}
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    @contextmanager
+    def phase(self, name):
+        started = self.memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        if self.memory:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            memory  = tracemalloc.get_traced_memory()[1] - base if self.memory else None
+            if started:
+                tracemalloc.stop()
+
+            record = self.phases.setdefault(name, {'time': 0.0, 'memory': None, 'calls': 0})
+            record['time']  += elapsed
+            record['calls'] += 1
+            if memory is not None:
+                record['memory'] = max(record['memory'] or 0, memory)
+            for hook in self.hooks:
+                hook('phase', name, {'time': elapsed, 'memory': memory})
+
+    def count(self, name, value):
+        self.counters[name] = value
+        for hook in self.hooks:
+            hook('counter', name, value)
+
+    @property
+    def total(self):
+        return sum(record['time'] for record in self.phases.values())
+
+    # Plain-dict copy (picklable, JSON-friendly)
+    def as_dict(self):
+        return {'phases': {name: dict(record) for name, record in self.phases.items()},
+                'counters': dict(self.counters), 'total': self.total}
+
+    def report(self):
+        return format_report(self.as_dict())
+
+
+# Text breakdown of an Instrumentation.as_dict(): one line per phase, then the counters
+def format_report(stats):
+    total = stats['total'] or 1.0
+    lines = []
+    for name, record in stats['phases'].items():
+        memory = f"  {record['memory'] / 2**20:8.1f} MB" if record['memory'] is not None else ''
+        lines.append(f"{name:<14s}{1e3 * record['time']:10.2f} ms {100 * record['time'] / total:5.1f} %{memory}")
+    lines.append(f"{'total':<14s}{1e3 * stats['total']:10.2f} ms")
+    if stats['counters']:
+        lines.append('  '.join(f"{name}={value:,}" if isinstance(value, int) else f"{name}={value}"
+                               for name, value in stats['counters'].items()))
+    return '\n'.join(lines)
+
+
+# Stand-in used when no instrumentation is asked for: phases and counters cost nothing
+class NullInstrumentation:
+
+    def phase(self, name):
+        return nullcontext()
+
+    def count(self, name, value):
+        pass
+
+
+NULL = NullInstrumentation()
@@ -0,0 +1,217 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+import solver as sv
+from instrument import NULL
+from truss2D import element_stiffness, assemble_stiffness, recover_elements
+
+
+# K.x applied element by element from the connectivity and direction cosines, without storing K.
+# matvec works on the free DOFs only, full_matvec on all DOFs (for the reactions).
+class MatrixFreeStiffness:
+
+    def __init__(self, model, free_dofs=None, dtype=np.float64):
+        self.model     = model
+        self.free_dofs = model.free_dofs if free_dofs is None else free_dofs
+        self.k         = (model.young * model.csarea / model.elength).astype(dtype)           # Axial stiffness EA/L
+        self.b         = model.b.astype(dtype)
+        self.shape     = (len(self.free_dofs), len(self.free_dofs))
+
+    def full_matvec(self, q):
+        m = self.model
+        f = (self.b * (self.k * np.einsum('ei,ei->e', self.b, q[m.dofs]))[:, None]).ravel()
+        return np.bincount(m.dofs.ravel(), weights=f, minlength=m.ngdof).astype(self.b.dtype, copy=False)
+
+    def matvec(self, x):
+        q = np.zeros(self.model.ngdof, dtype=np.result_type(x, self.b))
+        q[self.free_dofs] = x
+        return self.full_matvec(q)[self.free_dofs]
+
+    def diagonal(self):
+        m = self.model
+        d = np.bincount(m.dofs.ravel(), weights=(self.k[:, None] * self.b ** 2).ravel(), minlength=m.ngdof)
+        return d[self.free_dofs]
+
+
+# Incomplete factorization preconditioner. SciPy has no incomplete Cholesky, so this is SuperLU's ILU
+# in symmetric mode (no pivoting, minimum-degree ordering on A + A^T), which is the IC-like choice.
+class IncompleteCholesky:
+
+    def __init__(self, A, drop_tol=1e-4, fill_factor=10):
+        self._ilu = spla.spilu(sp.csc_matrix(A), drop_tol=drop_tol, fill_factor=fill_factor,
+                               permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0, options={'SymmetricMode': True})
+
+    def __call__(self, r):
+        return self._ilu.solve(r)
+
+
+# Two-level smoothed-aggregation AMG preconditioner (one symmetric V-cycle per application).
+# Nodes are aggregated greedily over the element graph; each aggregate carries its two rigid translations
+# and its in-plane rotation, the tentative prolongator is smoothed with damped Jacobi and the Galerkin
+# coarse operator is factored directly.
+class SmoothedAggregation:
+
+    def __init__(self, A, model, free_dofs, smoothing_steps=2):
+        A = sp.csr_matrix(A)
+        self.A     = A
+        self.steps = smoothing_steps
+        self.dinv  = 1.0 / A.diagonal()
+
+        # Greedy aggregation: an unassigned node and its unassigned neighbours form an aggregate
+        graph = sp.coo_matrix((np.ones(model.nelem), (model.lnods[:, 0], model.lnods[:, 1])), shape=(model.nnode,) * 2)
+        graph = (graph + graph.T).tocsr()
+        aggregate = np.full(model.nnode, -1)
+        count = 0
+        for node in range(model.nnode):
+            if aggregate[node] < 0:
+                neighbours = graph.indices[graph.indptr[node]:graph.indptr[node + 1]]
+                members = np.append(neighbours[aggregate[neighbours] < 0], node)
+                aggregate[members] = count
+                count += 1
+
+        # Tentative prolongator: x, y translation and rotation about the aggregate centroid. The rotation is
+        # orthogonalized against the translations of its aggregate (Gram-Schmidt over the free DOFs) and
+        # dropped where nothing is left, e.g. an aggregate with one free node or only x DOFs free, so that
+        # P0 keeps full column rank
+        node   = free_dofs // 2
+        axis   = free_dofs % 2
+        agg    = aggregate[node]
+        centre = np.stack([np.bincount(aggregate, weights=model.coord[:, i]) / np.bincount(aggregate) for i in (0, 1)], axis=1)
+        offset = model.coord[node] - centre[agg]
+        rotation = np.where(axis == 0, -offset[:, 1], offset[:, 0])
+        column   = 2 * agg + axis                                                   # translation column per DOF
+        ndof     = np.bincount(column, minlength=2 * count)
+        mean     = np.bincount(column, weights=rotation, minlength=2 * count) / np.maximum(ndof, 1)
+        rotation = rotation - mean[column]
+        size     = np.bincount(agg, weights=rotation ** 2, minlength=count)
+        scale    = np.bincount(agg, weights=(offset ** 2).sum(axis=1), minlength=count)
+        keep     = size[agg] > 1e-12 * np.maximum(scale[agg], np.finfo(float).tiny)
+        rows   = np.r_[np.arange(len(free_dofs)), np.flatnonzero(keep)]
+        cols   = np.r_[3 * agg + axis, 3 * agg[keep] + 2]
+        P0     = sp.csr_matrix((np.r_[np.ones(len(free_dofs)), rotation[keep]], (rows, cols)), shape=(len(free_dofs), 3 * count))
+        P0     = P0[:, np.flatnonzero(np.abs(P0).sum(axis=0).A1 > 0)]
+
+        # Smooth with damped Jacobi, omega = 4/3 / rho(D^-1 A) from a few power iterations
+        x = np.random.default_rng(0).random(A.shape[0])
+        for _ in range(10):
+            x = self.dinv * (A @ x)
+            x /= np.linalg.norm(x)
+        rho = np.linalg.norm(self.dinv * (A @ x))
+        self.omega = 1.0 / rho
+        P = P0 - (4.0 / 3.0 / rho) * sp.diags(self.dinv) @ A @ P0
+
+        self.P = P.tocsr()
+        self.coarse = sv.factorize((self.P.T @ A @ self.P).tocsr(), method='splu')
+
+    def __call__(self, r):
+        x = np.zeros_like(r)
+        for _ in range(self.steps):
+            x += self.omega * self.dinv * (r - self.A @ x)
+        x += self.P @ self.coarse.solve(self.P.T @ (r - self.A @ x))
+        for _ in range(self.steps):
+            x += self.omega * self.dinv * (r - self.A @ x)
+        return x
+
+
+# Preconditioned conjugate gradient on A (sparse matrix or an object with matvec) for one right-hand side.
+# Stops when ||r|| / ||b|| <= tol; x0 warm-starts from a previous solution. callback(iteration, residual) is
+# called after every iteration. Returns x and an info dict (iterations, converged, residuals).
+def pcg(A, b, M=None, x0=None, tol=1e-8, maxiter=None, callback=None):
+    matvec  = A.matvec if hasattr(A, 'matvec') and not sp.issparse(A) else A.dot
+    M       = M or (lambda r: r)
+    maxiter = maxiter or 10 * len(b)
+    bnorm   = np.linalg.norm(b) or 1.0
+
+    x  = np.zeros_like(b) if x0 is None else np.array(x0, dtype=b.dtype)
+    r  = b - matvec(x) if x0 is not None else b.copy()
+    z  = M(r)
+    p  = z.copy()
+    rz = r @ z
+    residuals = [np.linalg.norm(r) / bnorm]
+
+    while residuals[-1] > tol and len(residuals) <= maxiter:
+        Ap    = matvec(p)
+        alpha = rz / (p @ Ap)
+        x    += alpha * p
+        r    -= alpha * Ap
+        residuals.append(np.linalg.norm(r) / bnorm)
+        if callback is not None:
+            callback(len(residuals) - 1, residuals[-1])
+
+        z      = M(r)
+        rz_new = r @ z
+        p      = z + (rz_new / rz) * p
+        rz     = rz_new
+
+    return x, {'iterations': len(residuals) - 1, 'converged': residuals[-1] <= tol, 'residuals': residuals}
+
+
+# Iterative analysis of a truss2D.TrussModel for the load vector F (default: the model's loads) and the
+# model's prescribed displacements.
+#   preconditioner  None, 'jacobi', 'ic' (incomplete factorization) or 'amg' (smoothed aggregation)
+#   matrix_free     apply K element by element instead of assembling it (Jacobi or no preconditioner only)
+#   x0              previous displacement vector (ngdof,) to warm-start from
+#   instrument      instrument.Instrumentation timing assembly, preconditioner, solve, reactions and recovery
+#                   and counting ndof, nfree, nnz and the PCG iterations
+# Returns q, R, stresses and the PCG info dict.
+def solve_iterative(model, F=None, preconditioner='jacobi', matrix_free=False, tol=1e-8, maxiter=None,
+                    x0=None, callback=None, instrument=None):
+
+    ins  = instrument or NULL
+    F    = model.F if F is None else np.asarray(F, dtype=float)
+    free, fixed = model.free_dofs, model.fixed_dofs
+
+    with ins.phase('assembly'):
+        operator, diagonal, full_matvec = _operator(model, free, preconditioner, matrix_free)
+    ins.count('ndof', model.ngdof)
+    ins.count('nfree', len(free))
+    if not matrix_free:
+        ins.count('nnz', int(operator.nnz))
+
+    with ins.phase('preconditioner'):
+        M = _preconditioner(preconditioner, operator, diagonal, model, free)
+
+    # Prescribed displacements move to the right-hand side: F_f - Kfp U
+    q = np.zeros(model.ngdof)
+    q[fixed] = model.U
+    with ins.phase('solve'):
+        rhs = F[free] - full_matvec(q)[free] if model.U.any() else F[free]
+        u, info = pcg(operator, rhs, M, None if x0 is None else np.asarray(x0)[free], tol, maxiter, callback)
+    ins.count('iterations', info['iterations'])
+    q[free] = u
+    with ins.phase('reactions'):
+        R = full_matvec(q) - F
+    with ins.phase('recovery'):
+        stresses = recover_elements(model, q)['stress']
+
+    return q, R, stresses, info
+
+
+def _operator(model, free, preconditioner, matrix_free):
+    if matrix_free:
+        if preconditioner not in (None, 'jacobi'):
+            raise ValueError("The matrix-free mode supports only the Jacobi preconditioner.")
+        operator = MatrixFreeStiffness(model, free)
+        diagonal = operator.diagonal()
+        full_matvec = operator.full_matvec
+    else:
+        K = assemble_stiffness(model.ngdof, model.lnods,
+                               element_stiffness(model.young, model.csarea, model.elength, model.ecos, model.esin))
+        operator = K[free][:, free]
+        diagonal = operator.diagonal()
+        full_matvec = K.dot
+    return operator, diagonal, full_matvec
+
+
+def _preconditioner(preconditioner, operator, diagonal, model, free):
+    if preconditioner == 'jacobi':
+        M = lambda r: r / diagonal
+    elif preconditioner == 'ic':
+        M = IncompleteCholesky(operator)
+    elif preconditioner == 'amg':
+        M = SmoothedAggregation(operator, model, free)
+    elif preconditioner is None:
+        M = None
+    else:
+        raise ValueError(f"Unknown preconditioner '{preconditioner}'.")
+    return M
@@ -0,0 +1,129 @@
+import csv
+import json
+import os
+import numpy as np
+
+
+# A model on disk is either a JSON file
+#   {"nodes": [[x, y], ...], "elements": [[n1, n2, E, A], ...],
+#    "supports": [[node, x, y, ux, uy], ...], "loads": [[node, fx, fy], ...]}
+# or a directory holding nodes.csv, elements.csv, supports.csv and loads.csv with the same columns
+# (a header row is optional; supports.csv and loads.csv may be missing). Node numbers are 1-based, as in
+# the GUI, and the model is returned as the (coords, elements, prescribed, point_load) entry lists.
+# A support fixes the directions whose x / y flag is non-zero; ux, uy are the prescribed displacements of
+# those directions (support settlement) and may be left out or blank for zero.
+def is_model_dir(path):
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, 'nodes.csv'))
+
+
+# Columns of the four input tables; node and element numbers are integer columns, and blank optional
+# columns read as zero
+COLUMNS  = {'nodes': ('x', 'y'), 'elements': ('n1', 'n2', 'E', 'A'),
+            'supports': ('node', 'x', 'y', 'ux', 'uy'), 'loads': ('node', 'fx', 'fy')}
+INTEGERS = {'nodes': (), 'elements': (0, 1), 'supports': (0,), 'loads': (0,)}
+OPTIONAL = {'nodes': (), 'elements': (), 'supports': (3, 4), 'loads': ()}
+
+
+def read_model(path):
+    return tables_to_entries(read_tables(path))
+
+
+# The model at `path` as a dict of float arrays (one per table, shaped (rows, len(COLUMNS[name]))).
+# Blank or non-numeric cells become NaN so that check_tables can report them by row. A JSON file that is
+# not an object of lists of rows raises ValueError.
+def read_tables(path):
+    if is_model_dir(path):
+        return {name: _to_array(_read_csv(os.path.join(path, name + '.csv')), len(columns))
+                for name, columns in COLUMNS.items()}
+    with open(path) as f:
+        tables = json.load(f)
+    if not isinstance(tables, dict):
+        raise ValueError(f"{path}: the JSON model must be an object with the tables {', '.join(COLUMNS)}.")
+    for name in COLUMNS:
+        rows = tables.get(name) or []
+        if not isinstance(rows, list) or not all(isinstance(row, list) for row in rows):
+            raise ValueError(f"{path}: '{name}' must be a list of rows, each a list of numbers.")
+    return {name: _to_array(tables.get(name) or [], len(columns)) for name, columns in COLUMNS.items()}
+
+
+# Pasted or imported text (CSV, tab-separated as copied from a spreadsheet, or whitespace-separated)
+# as a float array with `ncols` columns; a header row is skipped
+def parse_table(text, ncols):
+    lines = [line for line in text.splitlines() if line.strip()]
+    delimiter = next((d for d in ('\t', ',', ';') if any(d in line for line in lines)), None)
+    rows = [[cell.strip() for cell in (line.split(delimiter) if delimiter else line.split())] for line in lines]
+    if rows:
+        try:
+            float(rows[0][0])
+        except ValueError:
+            rows = rows[1:]
+    return _to_array(rows, ncols)
+
+
+def _to_array(rows, ncols):
+    cells = np.full((len(rows), ncols), '', dtype=object)
+    for i, row in enumerate(rows):
+        row = list(row)[:ncols]
+        cells[i, :len(row)] = row
+    try:
+        return cells.astype(float)
+    except (TypeError, ValueError):
+        return np.vectorize(_number, otypes=[float])(cells)
+
+
+def _number(cell):
+    try:
+        return float(cell)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# Row-wise validation of all tables at once: missing or non-numeric cells and non-integer node numbers.
+# Returns {name: 0-based indices of the bad rows} for the tables with problems.
+def check_tables(tables):
+    bad = {}
+    for name, table in tables.items():
+        table   = np.asarray(table, dtype=float).reshape(-1, len(COLUMNS[name]))
+        invalid = ~np.isfinite(table)
+        invalid[:, list(OPTIONAL[name])] &= ~np.isnan(table[:, list(OPTIONAL[name])])
+        columns = list(INTEGERS[name])
+        invalid[:, columns] |= table[:, columns] != np.round(table[:, columns])
+        rows = np.flatnonzero(invalid.any(axis=1))
+        if len(rows):
+            bad[name] = rows
+    return bad
+
+
+# Validated tables as the GUI's (coords, elements, prescribed, point_load) entry lists
+def tables_to_entries(tables):
+    bad = check_tables(tables)
+    if bad:
+        raise ValueError("; ".join(f"{name}: row(s) {', '.join(str(i + 1) for i in rows[:10])} are incomplete or invalid"
+                                   for name, rows in bad.items()))
+    coords     = [tuple(row) for row in np.asarray(tables['nodes'], dtype=float).reshape(-1, 2).tolist()]
+    elements   = [(int(n1), int(n2), E, A) for n1, n2, E, A in np.asarray(tables['elements'], dtype=float).reshape(-1, 4).tolist()]
+    supports   = np.nan_to_num(np.asarray(tables['supports'], dtype=float).reshape(-1, 5))
+    prescribed = [(int(node), x, y, ux, uy) for node, x, y, ux, uy in supports.tolist()]
+    point_load = [(int(node), fx, fy) for node, fx, fy in np.asarray(tables['loads'], dtype=float).reshape(-1, 3).tolist()]
+    return coords, elements, prescribed, point_load
+
+
+def _read_csv(path):
+    if not os.path.isfile(path):
+        return []
+    with open(path, newline='') as f:
+        rows = [row for row in csv.reader(f) if row and any(cell.strip() for cell in row)]
+    if rows:
+        try:
+            float(rows[0][0])
+        except ValueError:
+            rows = rows[1:]
+    return [[cell.strip() for cell in row] for row in rows]
+
+
+# Results as JSON: per-node displacements and reactions ([x, y] rows) and per-element stresses
+def write_results(path, q, R, stresses):
+    with open(path, 'w') as f:
+        json.dump({'displacements': np.asarray(q).reshape(-1, 2).tolist(),
+                   'reactions':     np.asarray(R).reshape(-1, 2).tolist(),
+                   'stresses':      np.asarray(stresses).tolist()}, f)
@@ -0,0 +1,240 @@
+import numpy as np
+import solver as sv
+from instrument import NULL
+from incremental import stiffness_slots
+from truss2D import element_directions, assemble_stiffness
+
+
+# Corotational truss element state at displacements q (ngdof,): current lengths, direction vectors
+# b = [-c, -s, c, s] of the deformed members and axial forces N = EA (l - L) / L (tension positive).
+# The elongation is formed as (2 d . du + du . du) / (l + L) from the undeformed member vector d and the
+# relative end displacement du, which avoids the cancellation in l - L for small strains.
+def element_state(model, q):
+    u  = q.reshape(-1, 2)
+    d  = model.coord[model.lnods[:, 1]] - model.coord[model.lnods[:, 0]]
+    du = u[model.lnods[:, 1]] - u[model.lnods[:, 0]]
+    length = np.hypot(d[:, 0] + du[:, 0], d[:, 1] + du[:, 1])
+    elongation = np.einsum('ei,ei->e', 2 * d + du, du) / (length + model.elength)
+    force = model.young * model.csarea * elongation / model.elength
+    return length, element_directions((d[:, 0] + du[:, 0]) / length, (d[:, 1] + du[:, 1]) / length), force
+
+
+# Internal force vector (ngdof,): the member forces along the deformed member axes
+def internal_forces(model, q, state=None):
+    _, b, force = state or element_state(model, q)
+    return np.bincount(model.dofs.ravel(), weights=(force[:, None] * b).ravel(), minlength=model.ngdof)
+
+
+# Element tangent matrices (nelem, 4, 4): material part EA/L b b^T plus geometric part N/l t t^T, where
+# t = [s, -c, -s, c] is the relative transverse direction of the deformed member
+def tangent_matrices(model, q, state=None):
+    length, b, force = state or element_state(model, q)
+    t = np.stack([-b[:, 1], b[:, 0], b[:, 1], -b[:, 0]], axis=1)
+    k = model.young * model.csarea / model.elength
+    return (k[:, None, None] * b[:, :, None] * b[:, None, :] +
+            (force / length)[:, None, None] * t[:, :, None] * t[:, None, :])
+
+
+# Tangent stiffness K_t(q) as a CSR matrix
+def tangent_stiffness(model, q):
+    return assemble_stiffness(model.ngdof, model.lnods, tangent_matrices(model, q))
+
+
+class _Tangent:
+
+    # The sparsity of K_t never changes: the pattern, the slots of the element entries in K.data and the
+    # node ordering are set up once, and each refactorization only refills K.data and factors Kff
+    def __init__(self, model, method, ins):
+        self.model  = model
+        self.method = method
+        self.ins    = ins
+        self.free   = model.free_dofs
+        self.K      = tangent_stiffness(model, np.zeros(model.ngdof))
+        self.K.sort_indices()
+        self.slots  = stiffness_slots(self.K, model.lnods).ravel()
+        self.perm   = sv.dof_order(sv.rcm_node_order(model.lnods, model.nnode), self.free)
+        self.count  = 0
+
+    def factor(self, q):
+        with self.ins.phase('tangent'):
+            self.K.data = np.bincount(self.slots, weights=tangent_matrices(self.model, q).ravel(),
+                                      minlength=len(self.K.data))
+            Kff = self.K[self.free][:, self.free]
+        with self.ins.phase('factorization'):
+            self.solver = sv.factorize(Kff, perm=self.perm, method=self.method, dofs=self.free)
+        self.count += 1
+        return self.solver
+
+    def solve(self, r):
+        with self.ins.phase('solve'):
+            return self.solver.solve(r)
+
+
+# Geometrically nonlinear (large displacement) analysis of a truss2D.TrussModel with corotational elements
+# under the proportional load lambda F (default: the model's loads; prescribed displacements follow lambda
+# too).
+#   control='load'  load stepping to lambda = 1 in `steps` equal increments; an increment that fails is
+#                   halved and later increments grow back to 1 / steps. Past a limit point no increment
+#                   converges, and the analysis stops with LinAlgError once the increment has been cut
+#                   below 1 / 2**max_cuts of the first one
+#   control='arc'   cylindrical arc-length (Crisfield), which follows the path through limit points and
+#                   snap-through: `steps` increments of arc length, the first sized to reach lambda = 1 /
+#                   steps on the linear path and later ones up to 10 times longer while the iterations
+#                   converge quickly, stopping early once lambda reaches `max_load`. Kt may become
+#                   indefinite there, so it is factored with SuperLU instead of Cholesky.
+# Each load increment starts from the previous one extrapolated (secant predictor), and the equilibrium
+# iterations are modified Newton: the tangent factorization is kept across iterations and
+# increments and refactored at the current state only when the residual shrinks by less than `max_rate` in
+# an iteration (or grows), so a smooth 50-step analysis costs a few factorizations. Converged when
+# ||r|| <= tol ||F|| on the free DOFs, or tol ||Kfp U|| (the forces of the settlement on the initial
+# tangent) when only displacements are prescribed. `progress(increment, load_factor)` is called after
+# every increment.
+# Returns a dict: q, R (reactions, internal minus external forces), stresses, load_factor (final),
+# load_factors and path (the lambda and displacements of DOFs `record`, default all, after each increment),
+# history (per increment: load_factor, iterations, refactors, cuts, residual) and factorizations.
+def solve_nonlinear(model, steps=10, control='load', F=None, tol=1e-8, maxiter=30, max_rate=0.5, max_cuts=10,
+                    max_load=1.0, record=None, progress=None, instrument=None):
+
+    if control not in ('load', 'arc'):
+        raise ValueError(f"Unknown control '{control}'.")
+    ins   = instrument or NULL
+    F     = model.F if F is None else np.asarray(F, dtype=float)
+    U     = model.U
+    free, fixed = model.free_dofs, model.fixed_dofs
+    if control == 'arc' and U.any():
+        raise ValueError("Arc-length control does not support prescribed displacements; use load control.")
+    Ff    = F[free]
+    record = np.arange(model.ngdof) if record is None else np.asarray(record)
+
+    tangent = _Tangent(model, 'auto' if control == 'load' else 'splu', ins)
+    q, lam  = np.zeros(model.ngdof), 0.0
+    tangent.factor(q)
+    limit   = tol * (np.linalg.norm(Ff) or np.linalg.norm(tangent.K[free][:, fixed] @ U) or 1.0)
+    uF      = tangent.solve(Ff)                                          # Tangent displacement for F
+    step    = 1.0 / steps if control == 'load' else np.linalg.norm(uF) / steps
+    initial = step
+    last    = None                                                       # Previous converged increment (dq, dlam)
+    history, path = [], [np.r_[lam, q[record]]]
+
+    while lam < (1.0 if control == 'load' else max_load) - 1e-12 and (control == 'load' or len(history) < steps):
+        cuts = iterations = refactors = 0
+        while True:
+            if control == 'load':
+                result = _load_increment(model, tangent, q, lam, min(step, 1.0 - lam), Ff, U, free, fixed, last,
+                                         limit, maxiter, max_rate, ins)
+            else:
+                result = _arc_increment(model, tangent, q, lam, step, Ff, free, last, limit, maxiter, max_rate, ins)
+            iterations += result['iterations']
+            refactors  += result['refactors']
+            if result['converged']:
+                break
+            cuts += 1
+            step /= 2
+            if step < initial / 2 ** max_cuts:
+                raise np.linalg.LinAlgError(f"The nonlinear analysis did not converge at load factor {lam:.6g} "
+                                            f"(increment cut below 1/{2 ** max_cuts} of the first one).")
+            if result['refactors'] == 0:                                # Retry from a fresh tangent
+                _refactor(tangent, q, ins)
+                refactors += 1
+
+        last = (result['q'] - q, result['lam'] - lam)
+        q, lam = result['q'], result['lam']
+        history.append({'increment': len(history) + 1, 'load_factor': lam, 'iterations': iterations,
+                        'refactors': refactors, 'cuts': cuts, 'residual': result['residual']})
+        path.append(np.r_[lam, q[record]])
+        if result['iterations'] <= 3 and not cuts:
+            step = min(1.5 * step, initial if control == 'load' else 10 * initial)
+        if progress is not None:
+            progress(len(history), lam)
+
+    state = element_state(model, q)
+    R = internal_forces(model, q, state) - lam * F
+    R[free] = 0.0
+    path = np.array(path)
+    ins.count('increments', len(history))
+    ins.count('iterations', sum(h['iterations'] for h in history))
+    ins.count('factorizations', tangent.count)
+    return {'q': q, 'R': R, 'stresses': state[2] / model.csarea, 'load_factor': lam, 'load_factors': path[:, 0],
+            'path': path[:, 1:], 'history': history, 'factorizations': tangent.count}
+
+
+def _refactor(tangent, q, ins):
+    try:
+        tangent.factor(q)
+        return True
+    except np.linalg.LinAlgError:
+        return False
+
+
+# One load-controlled increment from (q, lam) to lam + dlam by modified Newton, starting from the previous
+# increment scaled to dlam (secant predictor)
+def _load_increment(model, tangent, q, lam, dlam, Ff, U, free, fixed, last, tol, maxiter, max_rate, ins):
+    lam_new  = lam + dlam
+    trial    = q.copy()
+    if last is not None:
+        trial[free] += dlam / last[1] * last[0][free]
+    trial[fixed] = lam_new * U
+    refactors = 0
+    previous  = np.inf
+    for iteration in range(maxiter + 1):
+        with ins.phase('residual'):
+            r = lam_new * Ff - internal_forces(model, trial)[free]
+            norm = np.linalg.norm(r)
+        if not np.isfinite(norm):
+            break
+        if norm <= tol:
+            return {'converged': True, 'q': trial, 'lam': lam_new, 'iterations': iteration, 'refactors': refactors,
+                    'residual': norm}
+        if iteration > 0 and norm > max_rate * previous:
+            if not _refactor(tangent, trial, ins):
+                break
+            refactors += 1
+        previous = norm
+        trial[free] += tangent.solve(r)
+    return {'converged': False, 'iterations': iteration, 'refactors': refactors}
+
+
+# One cylindrical arc-length increment of length dl from (q, lam): ||delta u|| = dl on the free DOFs, the
+# load factor follows. The direction of the predictor follows the previous increment `last`.
+def _arc_increment(model, tangent, q, lam, dl, Ff, free, last, tol, maxiter, max_rate, ins):
+    uF = tangent.solve(Ff)
+    sign = 1.0 if last is None or uF @ last[0][free] >= 0 else -1.0
+    dlam = sign * dl / np.linalg.norm(uF)
+    du   = dlam * uF
+    refactors = 0
+    previous  = np.inf
+    for iteration in range(maxiter + 1):
+        trial = q.copy()
+        trial[free] += du
+        with ins.phase('residual'):
+            r = (lam + dlam) * Ff - internal_forces(model, trial)[free]
+            norm = np.linalg.norm(r)
+        if not np.isfinite(norm):
+            break
+        if norm <= tol:
+            return {'converged': True, 'q': trial, 'lam': lam + dlam, 'iterations': iteration,
+                    'refactors': refactors, 'residual': norm}
+        if iteration > 0 and norm > max_rate * previous:
+            if not _refactor(tangent, trial, ins):
+                break
+            refactors += 1
+            uF = None
+        previous = norm
+
+        # Both corrections from one batched solve against the current factor
+        if uF is None:
+            ur, uF = tangent.solve(np.c_[r, Ff]).T
+        else:
+            ur = tangent.solve(r)
+
+        # ||du + ur + dl_ uF|| = dl; of the two roots take the one that keeps closest to the current direction
+        base = du + ur
+        a, b, c = uF @ uF, 2 * uF @ base, base @ base - dl ** 2
+        disc = b * b - 4 * a * c
+        if disc < 0:
+            break
+        roots = (-b + np.array([1.0, -1.0]) * np.sqrt(disc)) / (2 * a)
+        ddlam = roots[np.argmax([(base + x * uF) @ du for x in roots])]
+        du   += ur + ddlam * uF
+        dlam += ddlam
+    return {'converged': False, 'iterations': iteration, 'refactors': refactors}
@@ -0,0 +1,138 @@
+import numpy as np
+import scipy.optimize as so
+import solver as sv
+from truss2D import element_stiffness, assemble_stiffness
+
+
+# Kreisselmeier-Steinhauser aggregate of the constraint ratios g (a smooth, conservative max) and its weights
+def _ks(g, rho):
+    gmax = g.max()
+    w    = np.exp(rho * (g - gmax))
+    return gmax + np.log(w.sum()) / rho, w / w.sum()
+
+
+# Minimum-weight sizing of the member areas of a truss2D.TrussAnalysis under the load cases F (ngdof, ncase).
+#   stress_limit        allowable stress, a scalar or a (tension, compression) pair (scalars or per element)
+#   area_bounds         (Amin, Amax), scalars or per element
+#   displacement_limit  optional allowable |q| on `displacement_dofs` (0-based global DOFs, default all free DOFs)
+#   density             weight per unit volume (scalar or per element)
+#   U                   displacements of the fixed DOFs, (nfixed,) or (nfixed, ncase); default: the model's
+#                       prescribed displacements, applied as F_f - Kfp U with the stiffness of each design
+# The stress and displacement constraints are each aggregated over all elements, DOFs and load cases with
+# a KS function, so their gradients come from the adjoint method: one batched solve for the displacements
+# of all cases and one for the adjoint vectors of both constraints, no matter how many members there are.
+# The same node ordering is reused for every refactorization. Returns a dict with the optimized `csarea`,
+# `weight`, `success`, `message`, `feasible` and a per-iteration `history` (weight, max stress ratio, max
+# displacement ratio). success is False whenever the returned design breaks a limit, even if SLSQP stopped
+# normally.
+def minimum_weight(analysis, F, stress_limit, area_bounds, displacement_limit=None, displacement_dofs=None,
+                   density=1.0, ks_rho=100.0, maxiter=300, tol=1e-6, U=None):
+
+    a     = analysis
+    F     = np.asarray(F, dtype=float).reshape(a.ngdof, -1)
+    Ff    = F[a.free_dofs]
+    dofs  = a.model.dofs
+    b     = a.model.b
+    perm  = getattr(a.factor, 'perm', None)
+    U     = a.model.U if U is None else np.asarray(U, dtype=float)
+    U     = np.broadcast_to(U.reshape(len(a.fixed_dofs), -1), (len(a.fixed_dofs), F.shape[1]))
+
+    tension, compression = (stress_limit, stress_limit) if np.ndim(stress_limit) == 0 else stress_limit
+    tension     = np.broadcast_to(np.asarray(tension, dtype=float), (a.nelem,))[:, None]
+    compression = np.broadcast_to(np.asarray(compression, dtype=float), (a.nelem,))[:, None]
+
+    amin, amax  = area_bounds
+    amin        = np.broadcast_to(np.asarray(amin, dtype=float), (a.nelem,))
+    amax        = np.broadcast_to(np.asarray(amax, dtype=float), (a.nelem,))
+    member_mass = np.broadcast_to(np.asarray(density, dtype=float), (a.nelem,)) * a.elength
+
+    if displacement_limit is not None:
+        free_index = np.full(a.ngdof, -1)
+        free_index[a.free_dofs] = np.arange(len(a.free_dofs))
+        watched = free_index[a.free_dofs if displacement_dofs is None else np.asarray(displacement_dofs, dtype=int)]
+        watched = watched[watched >= 0]
+
+    cache = {}
+
+    # One analysis per design: factor, solve all load cases, then one batched adjoint solve
+    def evaluate(A):
+        if cache.get('A') is not None and np.array_equal(cache['A'], A):
+            return cache
+
+        K      = assemble_stiffness(a.ngdof, a.lnods, element_stiffness(a.young, A, a.elength, a.ecos, a.esin))
+        factor = sv.factorize(K[a.free_dofs][:, a.free_dofs], perm=perm, method=a.factor.method, dofs=a.free_dofs)
+
+        q = np.zeros((a.ngdof, F.shape[1]))
+        q[a.fixed_dofs] = U
+        u = factor.solve(Ff - K[a.free_dofs][:, a.fixed_dofs] @ U if U.any() else Ff)
+        q[a.free_dofs] = u
+
+        strain   = np.einsum('ei,eic->ec', b, q[dofs]) / a.elength[:, None]
+        stresses = a.young[:, None] * strain
+
+        # Stress constraint: KS over sigma/tension and -sigma/compression, d/dq via the chain rule
+        g_s, w   = _ks(np.concatenate([stresses / tension, -stresses / compression]).ravel(), ks_rho)
+        w        = w.reshape(2, a.nelem, -1)
+        dsigma   = w[0] / tension - w[1] / compression                                # dKS/dsigma, (nelem, ncase)
+        rhs_s    = np.zeros_like(q)
+        np.add.at(rhs_s, dofs, (a.young / a.elength)[:, None, None] * b[:, :, None] * dsigma[:, None, :])
+        rhs      = [rhs_s[a.free_dofs]]
+        ratios   = {'stress': g_s, 'max_stress': np.max(np.concatenate([stresses / tension, -stresses / compression]))}
+
+        if displacement_limit is not None:
+            disp = u[watched] / displacement_limit
+            g_d, w = _ks(np.concatenate([disp, -disp]).ravel(), ks_rho)
+            w      = w.reshape(2, len(watched), -1)
+            rhs_d  = np.zeros_like(u)
+            np.add.at(rhs_d, watched, (w[0] - w[1]) / displacement_limit)
+            rhs.append(rhs_d)
+            ratios.update(displacement=g_d, max_displacement=np.abs(disp).max())
+
+        # Adjoint: dg/dA_e = -sum_cases lambda^T (dK/dA_e) q = -E_e/L_e * (b_e . lambda_e) * (b_e . q_e)
+        lam_f = factor.solve(np.hstack(rhs))
+        grads = []
+        for i in range(len(rhs)):
+            lam = np.zeros_like(q)
+            lam[a.free_dofs] = lam_f[:, i * F.shape[1]:(i + 1) * F.shape[1]]
+            bl = np.einsum('ei,eic->ec', b, lam[dofs])
+            bq = np.einsum('ei,eic->ec', b, q[dofs])
+            grads.append(-(a.young / a.elength) * (bl * bq).sum(axis=1))
+
+        cache.clear()
+        cache.update(A=A.copy(), ratios=ratios, grads=grads)
+        return cache
+
+    # SLSQP works on x = A / scale and the weight relative to the starting design, so the variables, the
+    # objective and the constraint ratios are all of order one whatever the units
+    A0    = np.clip(a.csarea, amin, amax)
+    scale = A0.copy()
+    w0    = member_mass @ A0
+    constraints = [{'type': 'ineq', 'fun': lambda x: 1.0 - evaluate(x * scale)['ratios']['stress'],
+                    'jac': lambda x: -evaluate(x * scale)['grads'][0] * scale}]
+    if displacement_limit is not None:
+        constraints.append({'type': 'ineq', 'fun': lambda x: 1.0 - evaluate(x * scale)['ratios']['displacement'],
+                            'jac': lambda x: -evaluate(x * scale)['grads'][1] * scale})
+
+    history = []
+
+    def record(A):
+        ratios = evaluate(A)['ratios']
+        history.append({'weight': float(member_mass @ A), 'max_stress_ratio': float(ratios['max_stress']),
+                        'max_displacement_ratio': float(ratios.get('max_displacement', np.nan))})
+
+    record(A0)
+    result = so.minimize(lambda x: member_mass @ (x * scale) / w0, np.ones(a.nelem), jac=lambda x: member_mass * scale / w0,
+                         method='SLSQP', bounds=so.Bounds(amin / scale, amax / scale), constraints=constraints,
+                         callback=lambda x: record(x * scale), options={'maxiter': maxiter, 'ftol': tol})
+
+    # The design must meet the limits themselves, not only their KS estimates
+    A       = result.x * scale
+    ratios  = evaluate(A)['ratios']
+    worst   = max(ratios['max_stress'], ratios.get('max_displacement', 0.0))
+    message = result.message
+    if worst > 1.0 + 1e-6:
+        message = (f"{message}; the design breaks the limits (stress ratio {ratios['max_stress']:.3g}"
+                   + (f", displacement ratio {ratios['max_displacement']:.3g}" if displacement_limit is not None else '')
+                   + ")")
+    return {'csarea': A, 'weight': float(member_mass @ A), 'success': bool(result.success) and worst <= 1.0 + 1e-6,
+            'feasible': bool(worst <= 1.0 + 1e-6), 'message': message, 'iterations': result.nit, 'history': history}
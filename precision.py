@@ -0,0 +1,87 @@
+import numpy as np
+import solver as sv
+from iterative import MatrixFreeStiffness
+from truss2D import TrussAnalysis, element_stiffness, assemble_stiffness, recover_elements
+
+
+# Mixed-precision analysis of a truss2D.TrussModel: K is assembled and Kff factored in float32, which halves
+# the memory of the matrix and the factor. float64 accuracy is then recovered by iterative refinement on
+# the float64 residual F - K q, which is applied element by element so no float64 K is ever stored.
+# Refinement stops once the normwise backward error ||F - K q|| / (||K|| ||q|| + ||F||) (infinity norms)
+# is below `tol`. When the spread of member stiffnesses EA/L exceeds `max_spread`, or refinement stalls
+# or has not converged after `maxiter` steps, the model is solved in float64 instead. The model's prescribed
+# displacements are applied as in truss2D.TrussAnalysis.solve.
+# Returns q, R, stresses and an info dict: precision ('mixed' or 'double'), iterations, backward_error,
+# memory_saved (bytes of matrix and factor values saved against float64) and fallback (the reason, or None).
+def solve_mixed(model, F=None, tol=1e-14, maxiter=10, max_spread=1e6):
+
+    F    = model.F if F is None else np.asarray(F, dtype=float)
+    free = model.free_dofs
+    k    = model.young * model.csarea / model.elength
+
+    # Prescribed displacements move to the right-hand side: F_f - Kfp U
+    q = np.zeros(model.ngdof)
+    q[model.fixed_dofs] = model.U
+    Ff = F[free] - MatrixFreeStiffness(model, free).full_matvec(q)[free] if model.U.any() else F[free]
+    info = {'precision': 'mixed', 'iterations': 0, 'backward_error': np.inf, 'memory_saved': 0, 'fallback': None}
+
+    if k.max() > max_spread * k.min():
+        info['fallback'] = f"stiffness spread {k.max() / k.min():.3g} exceeds {max_spread:.3g}"
+    else:
+        x = _refine(model, Ff, k, info, tol, maxiter)
+        if x is not None:
+            q[free] = x
+            R = MatrixFreeStiffness(model, free).full_matvec(q) - F
+            return q, R, recover_elements(model, q)['stress'], info
+
+    analysis = TrussAnalysis(model)
+    q, R, stresses = analysis.solve(F, model.U)
+    berr = np.abs(R[free]).max(initial=0.0) / (_stiffness_norm(model, k) * np.abs(q[free]).max(initial=0.0)
+                                                + np.abs(Ff).max(initial=0.0) or 1.0)
+    info.update(precision='double', memory_saved=0, backward_error=float(berr))
+    return q, R, stresses, info
+
+
+# ||Kff||_inf from the element contributions, without assembling K
+def _stiffness_norm(model, k):
+    row_sums = np.bincount(model.dofs.ravel(), minlength=model.ngdof,
+                           weights=(k[:, None] * np.abs(model.b) * np.abs(model.b).sum(axis=1)[:, None]).ravel())
+    return row_sums[model.free_dofs].max(initial=0.0)
+
+
+# float32 factorization plus float64 refinement; returns the free displacements, or None (with
+# info['fallback'] set) when the float32 factor fails or the refinement does not reach `tol`
+def _refine(model, Ff, k, info, tol, maxiter):
+    free = model.free_dofs
+    K32  = assemble_stiffness(model.ngdof, model.lnods,
+                              element_stiffness(model.young, model.csarea, model.elength, model.ecos, model.esin).astype(np.float32))
+    perm = sv.dof_order(sv.rcm_node_order(model.lnods, model.nnode), free)
+    try:
+        factor = sv.factorize(K32[free][:, free], perm=perm, dofs=free)
+    except np.linalg.LinAlgError:
+        info['fallback'] = "float32 factorization is not positive definite"
+        return None
+    # float64 values take twice the bytes of float32 ones, so the saving is the float32 value storage; the
+    # integer index arrays are the same in both precisions
+    info['memory_saved'] = K32.data.nbytes + factor.value_nbytes
+    del K32
+
+    # K x in float64, element by element
+    operator = MatrixFreeStiffness(model, free)
+    knorm    = _stiffness_norm(model, k)
+    fnorm    = np.abs(Ff).max(initial=0.0)
+
+    x = factor.solve(Ff.astype(np.float32)).astype(np.float64)
+    for step in range(1, maxiter + 1):
+        r    = Ff - operator.matvec(x)
+        berr = np.abs(r).max(initial=0.0) / (knorm * np.abs(x).max(initial=0.0) + fnorm or 1.0)
+        stalled = berr > 0.5 * info['backward_error']
+        info.update(iterations=step, backward_error=float(berr))
+        if berr <= tol:
+            return x
+        if stalled:
+            break
+        x += factor.solve(r.astype(np.float32))
+
+    info['fallback'] = f"refinement stopped at backward error {info['backward_error']:.3g}"
+    return None
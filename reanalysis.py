@@ -0,0 +1,87 @@
+import time
+import numpy as np
+import scipy.sparse as sp
+import solver as sv
+
+
+# Fast reanalysis after changing E and/or A of a few members, reusing the base factorization of a
+# truss2D.TrussAnalysis. Every member adds EA/L * b b^T to K, so changing k members is the rank-k update
+#     Kff' = Kff + B D B^T        (B: member b vectors on the free DOFs, D: change of EA/L)
+# which is solved with the Woodbury identity from k + ncase triangular solves against the base factor.
+# Past `max_rank` members the modified Kff is refactored instead. max_rank=None sets the switch point from
+# the measured cost of one triangular solve against the base factorization time.
+# Changes are always relative to the base model; the base analysis is never modified.
+class Reanalysis:
+
+    def __init__(self, analysis, max_rank=None):
+        self.analysis = analysis
+        self._dofs    = analysis.model.dofs
+        self._b       = analysis.model.b
+
+        if max_rank is None:
+            start = time.perf_counter()
+            analysis.factor.solve(np.zeros(len(analysis.free_dofs)))
+            solve_time = max(time.perf_counter() - start, 1e-9)
+            max_rank   = max(1, int(analysis.factor_time / solve_time))
+        self.max_rank = max_rank
+
+    # Solve F (ngdof,) or (ngdof, ncase) with members `elements` (0-based) given new `young` and/or `csarea`.
+    # U holds the displacements of the fixed DOFs as in truss2D.TrussAnalysis.solve, (nfixed,) or
+    # (nfixed, ncase); None takes the model's prescribed displacements. They enter as F_f - K'fp U with the
+    # modified stiffness. Returns q, R, stresses and an info dict: method ('woodbury' or 'refactor'), rank,
+    # time and the speedup over the base assembly + factorization.
+    def solve(self, F, elements, young=None, csarea=None, U=None):
+        start = time.perf_counter()
+        a     = self.analysis
+
+        elements   = np.atleast_1d(np.asarray(elements, dtype=int))
+        new_young  = a.young.copy()
+        new_csarea = a.csarea.copy()
+        if young is not None:
+            new_young[elements] = young
+        if csarea is not None:
+            new_csarea[elements] = csarea
+
+        k  = len(elements)
+        dk = (new_young[elements] * new_csarea[elements] - a.young[elements] * a.csarea[elements]) / a.elength[elements]
+
+        # Columns of V are the member b vectors in global DOFs, so K' = K + V diag(dk) V^T
+        V  = sp.csr_matrix((self._b[elements].ravel(), (self._dofs[elements].ravel(), np.repeat(np.arange(k), 4))),
+                           shape=(a.ngdof, k))
+        Vf = V[a.free_dofs]
+        stiffness = lambda x: a.K @ x + V @ (dk * (V.T @ x).T).T                 # K' x
+
+        # Prescribed displacements move to the right-hand side
+        F = np.asarray(F, dtype=float)
+        q = np.zeros_like(F)
+        U = a.model.U if U is None else np.asarray(U, dtype=float)
+        if U.any():
+            q[a.fixed_dofs] = U if U.ndim == F.ndim else U.reshape((-1,) + (1,) * (F.ndim - 1))
+            Ff = (F - stiffness(q))[a.free_dofs].reshape(len(a.free_dofs), -1)
+        else:
+            Ff = F[a.free_dofs].reshape(len(a.free_dofs), -1)
+
+        if k <= self.max_rank:
+            B = Vf.toarray()
+            Y = a.factor.solve(np.hstack([Ff, B]))
+            y, Z = Y[:, :Ff.shape[1]], Y[:, Ff.shape[1]:]
+            S = np.eye(k) + dk[:, None] * (B.T @ Z)
+            u = y - Z @ np.linalg.solve(S, dk[:, None] * (B.T @ y))
+            method = 'woodbury'
+        else:
+            Kff    = (a.Kff + Vf @ sp.diags(dk) @ Vf.T).tocsr()
+            factor = sv.factorize(Kff, perm=getattr(a.factor, 'perm', None), method=a.factor.method, dofs=a.free_dofs)
+            u      = factor.solve(Ff)
+            method = 'refactor'
+
+        q[a.free_dofs] = u.reshape(F[a.free_dofs].shape)
+
+        # Reactions with the modified stiffness
+        R = stiffness(q) - F
+
+        stresses = a.stresses(q, young=new_young)
+
+        elapsed = time.perf_counter() - start
+        info = {'method': method, 'rank': k, 'time': elapsed, 'speedup': a.setup_time / elapsed}
+
+        return q, R, stresses, info
@@ -0,0 +1,165 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.linalg as sl
+import scipy.sparse.linalg as spla
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+
+# Reverse Cuthill-McKee ordering of the nodes, taken from the element connectivity (0-based lnods)
+def rcm_node_order(lnods, nnode):
+    graph = sp.coo_matrix((np.ones(len(lnods)), (lnods[:, 0], lnods[:, 1])), shape=(nnode, nnode)).tocsr()
+    return reverse_cuthill_mckee((graph + graph.T).tocsr(), symmetric_mode=True)
+
+
+# Permutation of the free DOFs that follows a node ordering (both DOFs of a node stay adjacent)
+def dof_order(node_order, free_dofs):
+    position = np.empty(len(node_order), dtype=int)
+    position[node_order] = np.arange(len(node_order))
+    key = 2 * position[free_dofs // 2] + free_dofs % 2
+    return np.argsort(key, kind='stable')
+
+
+# Half-bandwidth of a sparse matrix: max |i - j| over the stored entries
+def bandwidth(A):
+    A = A.tocoo()
+    return int(np.abs(A.row - A.col).max()) if A.nnz else 0
+
+
+# Raised when a factorization meets a zero or negative pivot; `dof` is the global DOF (0-based) where it happened
+class NotPositiveDefinite(np.linalg.LinAlgError):
+
+    def __init__(self, dof):
+        self.dof = int(dof)
+        axis = 'X' if dof % 2 == 0 else 'Y'
+        super().__init__(f"Stiffness matrix is not positive definite at node {dof // 2 + 1} ({axis}). "
+                         f"The truss is unstable or insufficiently supported.")
+
+
+def _not_positive_definite(dof):
+    raise NotPositiveDefinite(dof)
+
+
+# Sparse factorization of the symmetric positive definite Kff block.
+#   method='banded' : reorder (RCM unless a permutation is given) and run a banded Cholesky (LAPACK pbtrf); the
+#                     original order is kept when its band is narrower than the reordered one
+#   method='splu'   : SuperLU with a minimum-degree ordering on A + A^T and symmetric pivoting
+#   method='auto'   : banded while the band holds at most 64 times the nonzeros of the lower triangle (on
+#                     square lattices up to 300 x 300 the banded factor is still the faster one)
+# `dofs` are the global DOF numbers of the rows and are only used to name the culprit in error messages.
+# After construction `stats` holds n, nnz, the bandwidth and the factor storage ("fill") before and after
+# reordering, where the "before" figures are those of a banded factorization in the original order.
+class SparseCholesky:
+
+    def __init__(self, A, perm=None, method='auto', dofs=None):
+        A = sp.csr_matrix(A)
+        n = A.shape[0]
+        self.n    = n
+        self.dofs = np.arange(n) if dofs is None else np.asarray(dofs)
+
+        if perm is None:
+            perm = reverse_cuthill_mckee(A, symmetric_mode=True)
+        self.perm = np.asarray(perm)
+
+        nnz_lower = (A.nnz + n) // 2
+        bw_before = bandwidth(A)
+        Ap        = A[self.perm][:, self.perm]
+        bw_after  = bandwidth(Ap)
+        if bw_before < bw_after:                                         # The ordering widens the band: keep the original
+            self.perm, Ap, bw_after = np.arange(n), A, bw_before
+
+        if method == 'auto':
+            method = 'banded' if (bw_after + 1) * n <= 64 * nnz_lower else 'splu'
+        self.method = method
+
+        if method == 'banded':
+            self._factor_banded(Ap, bw_after)
+            fill_after = (bw_after + 1) * n
+        elif method == 'splu':
+            self._factor_splu(A)
+            fill_after = self._lu.L.nnz
+        else:
+            raise ValueError(f"Unknown factorization method '{method}'.")
+
+        self.stats = {'method': method, 'n': n, 'nnz': A.nnz,
+                      'bandwidth_before': bw_before, 'bandwidth_after': bw_after,
+                      'fill_before': (bw_before + 1) * n, 'fill_after': fill_after}
+
+    def _factor_banded(self, Ap, bw):
+        Ap = sp.tril(Ap).tocoo()
+        ab = np.zeros((bw + 1, self.n), dtype=Ap.dtype)
+        ab[Ap.row - Ap.col, Ap.col] = Ap.data
+
+        pbtrf, = sl.get_lapack_funcs(('pbtrf',), (ab,))
+        cb, info = pbtrf(ab, lower=1)
+        if info > 0:
+            _not_positive_definite(self.dofs[self.perm[info - 1]])
+        self._cb = cb
+
+    def _factor_splu(self, A):
+        try:
+            self._lu = spla.splu(A.tocsc(), permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0,
+                                 options={'SymmetricMode': True})
+        except RuntimeError:
+            raise np.linalg.LinAlgError("Stiffness matrix is singular. Check the supports and the element connectivity.")
+        pivots = np.abs(self._lu.U.diagonal())
+        if pivots.min() <= 1e-12 * pivots.max():
+            _not_positive_definite(self.dofs[np.flatnonzero(self._lu.perm_c == np.argmin(pivots))[0]])
+
+    # Memory held by the factor in bytes
+    @property
+    def nbytes(self):
+        if self.method == 'splu':
+            return sum(M.data.nbytes + M.indices.nbytes + M.indptr.nbytes for M in (self._lu.L, self._lu.U))
+        return self._cb.nbytes
+
+    # Memory held by the factor's values alone, without the integer index arrays
+    @property
+    def value_nbytes(self):
+        if self.method == 'splu':
+            return self._lu.L.data.nbytes + self._lu.U.data.nbytes
+        return self._cb.nbytes
+
+    # Solve A x = b for one right-hand side (n,) or a block of them (n, k)
+    def solve(self, b):
+        b = np.asarray(b)
+        if self.method == 'splu':
+            return self._lu.solve(b)
+
+        x = np.empty_like(b, dtype=np.result_type(b, self._cb))
+        x[self.perm] = sl.cho_solve_banded((self._cb, True), b[self.perm], check_finite=False)
+        return x
+
+
+# Dense Cholesky of Kff with the same interface, for small models and for checking the sparse path
+class DenseCholesky:
+
+    def __init__(self, A, dofs=None):
+        A = A.toarray() if sp.issparse(A) else np.asarray(A)
+        self.n      = A.shape[0]
+        self.dofs   = np.arange(self.n) if dofs is None else np.asarray(dofs)
+        self.method = 'dense'
+
+        potrf, = sl.get_lapack_funcs(('potrf',), (A,))
+        self._c, info = potrf(A, lower=1, clean=0)
+        if info > 0:
+            _not_positive_definite(self.dofs[info - 1])
+        self.stats = {'method': 'dense', 'n': self.n, 'nnz': int(np.count_nonzero(A)),
+                      'bandwidth_before': self.n - 1, 'bandwidth_after': self.n - 1,
+                      'fill_before': self.n * self.n, 'fill_after': self.n * self.n}
+
+    @property
+    def nbytes(self):
+        return self._c.nbytes
+
+    @property
+    def value_nbytes(self):
+        return self._c.nbytes
+
+    def solve(self, b):
+        return sl.cho_solve((self._c, True), b, check_finite=False)
+
+
+def factorize(A, perm=None, method='auto', dofs=None):
+    if method == 'dense':
+        return DenseCholesky(A, dofs=dofs)
+    return SparseCholesky(A, perm=perm, method=method, dofs=dofs)
@@ -0,0 +1,276 @@
+import os
+import time
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ThreadPoolExecutor
+import solver as sv
+from instrument import NULL
+from truss2D import assemble_stiffness, count_factor, element_stiffness, recover_elements
+
+
+# Panel label per element (nelem,) for a truss made of bays along `axis` (0: x, 1: y): element e goes to
+# panel floor((midpoint - origin) / width), origin defaulting to the smallest coordinate. A member that
+# lies on a panel edge (a vertical between two bays) goes to the panel after it.
+def panels_by_position(model, width, axis=0, origin=None):
+    centre = model.coord[model.lnods, axis].mean(axis=1)
+    origin = model.coord[:, axis].min() if origin is None else origin
+    return np.floor((centre - origin) / width + 1e-9).astype(int)
+
+
+# Node DOFs (..., 2 k) of node arrays (..., k), x and y of each node adjacent
+def _node_dofs(nodes):
+    return (2 * nodes[..., None] + np.arange(2)).reshape(nodes.shape[:-1] + (-1,))
+
+
+# One kind of panel, condensed once and shared by all its instances.
+#   nodes     (ninst, k)   global nodes of every instance, in the panel's canonical order
+#   boundary  (k,) bool    nodes shared with the rest of the structure or supported
+# The representative instance gives the local stiffness, partitioned into boundary (b) and interior (i)
+# DOFs; Kii is factored and the condensation keeps
+#   T = -Kii^-1 Kib      interior displacements per unit boundary displacement
+#   S = Kbb + Kbi T      the boundary stiffness (Schur complement)
+# so that an instance's interior load Fi adds T^T Fi to its boundary loads and its interior displacements
+# are ui = Kii^-1 Fi + T ub.
+class _PanelType:
+
+    def __init__(self, model, elements, nodes, boundary, method):
+        self.nodes    = nodes
+        self.bnodes   = nodes[:, boundary]
+        self.inodes   = nodes[:, ~boundary]
+        self.bdofs    = _node_dofs(self.bnodes)
+        self.idofs    = _node_dofs(self.inodes)
+        self.elements = elements
+
+        local = np.full(model.nnode, -1)
+        local[nodes[0]] = np.arange(nodes.shape[1])
+        ke = element_stiffness(model.young[elements], model.csarea[elements], model.elength[elements],
+                               model.ecos[elements], model.esin[elements])
+        K  = assemble_stiffness(2 * nodes.shape[1], local[model.lnods[elements]], ke)
+        b  = _node_dofs(np.flatnonzero(boundary))
+        i  = _node_dofs(np.flatnonzero(~boundary))
+
+        Kbb = K[b][:, b].toarray()
+        if len(i):
+            self.factor = sv.factorize(K[i][:, i], method=method, dofs=self.idofs[0])
+            self.T = -self.factor.solve(K[i][:, b].toarray())
+            S = Kbb + K[b][:, i] @ self.T
+        else:
+            self.factor, self.T, S = None, np.zeros((0, len(b))), Kbb
+        self.S = (S + S.T) / 2
+
+    @property
+    def count(self):
+        return len(self.nodes)
+
+    # Interior displacements of instances `rows` from the boundary displacements in q (ngdof, ...)
+    def recover(self, q, F, rows):
+        ub = q[self.bdofs[rows]]                                           # (n, nb, ...)
+        ui = np.einsum('ij,nj...->ni...', self.T, ub)
+        Fi = F[self.idofs[rows]]
+        if Fi.any():
+            shape = Fi.shape
+            Fi = np.moveaxis(Fi, 0, 1).reshape(shape[1], -1)
+            ui += np.moveaxis(self.factor.solve(Fi).reshape((shape[1], shape[0]) + shape[2:]), 0, 1)
+        q[self.idofs[rows]] = ui
+
+
+# Global nodes of every panel in canonical order (sorted by position relative to the panel's lower-left
+# corner, snapped to 1e-6 of the shortest member) and the panel types: panels with the same snapped
+# geometry, members, E, A and boundary nodes are one type. Returns a list of (elements, nodes (ninst, k),
+# boundary (k,)) per type. Panels are handled in groups of equal member and node counts, so the work is
+# a few array operations per group rather than per panel.
+def _panel_types(model, label, boundary):
+    labelled = np.flatnonzero(label >= 0)
+    order   = labelled[np.argsort(label[labelled], kind='stable')]
+    counts  = np.bincount(label[labelled])
+    offsets = np.r_[0, np.cumsum(counts)[:-1]]
+    scale   = model.elength.min() * 1e-6
+    types   = []
+
+    for m in np.unique(counts[counts > 0]):
+        panels   = np.flatnonzero(counts == m)
+        elements = order[offsets[panels][:, None] + np.arange(m)]           # (P, m)
+        ends     = np.sort(model.lnods[elements].reshape(len(panels), -1), axis=1)
+        new      = np.ones(ends.shape, dtype=bool)
+        new[:, 1:] = ends[:, 1:] != ends[:, :-1]
+        nnodes   = new.sum(axis=1)
+
+        for k in np.unique(nnodes):
+            rows  = np.flatnonzero(nnodes == k)
+            elems = elements[rows]
+            nodes = ends[rows][new[rows]].reshape(len(rows), k)              # Sorted global nodes per panel
+            P     = len(rows)
+
+            xy    = model.coord[nodes]
+            grid  = np.round((xy - xy.min(axis=1, keepdims=True)) / scale).astype(np.int64)
+            canon = np.lexsort((grid[..., 1], grid[..., 0]), axis=-1)
+            rank  = np.argsort(canon, axis=1)                                # Canonical index of each sorted node
+
+            # Members as canonical node pairs, sorted, with their E and A
+            flat  = (np.arange(P)[:, None] * model.nnode + nodes).ravel()
+            ends2 = model.lnods[elems].reshape(P, -1)
+            pos   = np.searchsorted(flat, np.arange(P)[:, None] * model.nnode + ends2) - np.arange(P)[:, None] * k
+            pairs = np.sort(np.take_along_axis(rank, pos, axis=1).reshape(P, m, 2), axis=2)
+            young, csarea = model.young[elems], model.csarea[elems]
+            members = np.lexsort((csarea, young, pairs[..., 1], pairs[..., 0]), axis=-1)
+            take  = lambda a: np.take_along_axis(a, members, axis=1)
+
+            nodes = np.take_along_axis(nodes, canon, axis=1)
+            key   = np.c_[np.take_along_axis(grid, canon[..., None], axis=1).reshape(P, -1),
+                          take(pairs[..., 0]), take(pairs[..., 1]),
+                          take(young).view(np.int64), take(csarea).view(np.int64), boundary[nodes]]
+            kind  = _row_kinds(key)
+            for t in range(kind.max() + 1):
+                instances = np.flatnonzero(kind == t)
+                types.append((elems[instances[0]], nodes[instances], boundary[nodes[instances[0]]]))
+    return types
+
+
+# Group number of every row of an integer array, equal rows sharing one: rows are hashed to 64 bits
+# (far quicker than np.unique(axis=0)) and checked against the first row of their group, falling back
+# to the exact comparison on a hash collision
+def _row_kinds(key):
+    weights = np.random.default_rng(0).integers(1, 2**62, key.shape[1]) | 1
+    _, first, kind = np.unique(key @ weights, return_index=True, return_inverse=True)
+    if not np.array_equal(key, key[first[kind]]):
+        _, kind = np.unique(key, axis=0, return_inverse=True)
+    return kind.ravel()
+
+
+# Linear analysis of a truss2D.TrussModel by substructuring. `panels` labels every element with its
+# panel (0, 1, ...; -1 for members outside all panels, see panels_by_position). A panel's nodes shared
+# with other panels or with the unlabelled members, and its supported nodes, form its boundary; the
+# rest are interior. Identical panels (same geometry up to translation, members, E, A and boundary) are
+# condensed once to their boundary stiffness, so a truss of hundreds of equal panels costs a handful of
+# small condensations. The interface system (boundary nodes, unlabelled members and nodes) is assembled
+# from the condensed panels and factored, and solve recovers the interior displacements panel by panel.
+# workers > 0 runs the condensations and the recovery on that many threads (the work is in LAPACK, which
+# releases the GIL); None uses one per CPU and 0 runs in the calling thread.
+# With `instrument`, records the phases partition, condensation, assembly, factorization, solve,
+# recovery and reactions, and counts panels, panel_types and the interface size next to count_factor's.
+class SubstructuredAnalysis:
+
+    def __init__(self, model, panels, solver='sparse', workers=0, instrument=None):
+
+        start = time.perf_counter()
+        self.instrument = ins = instrument or NULL
+        self.model   = model
+        self.workers = workers
+        self.ngdof   = model.ngdof
+        self.free_dofs, self.fixed_dofs = model.free_dofs, model.fixed_dofs
+        method = 'auto' if solver == 'sparse' else solver
+
+        label = np.array(panels, dtype=int)
+        if label.shape != (model.nelem,):
+            raise ValueError(f"Panel labels must have one entry per element ({model.nelem}), not {label.shape}.")
+
+        # Interior nodes touch the members of one panel only and are not supported
+        with ins.phase('partition'):
+            inpanel  = label >= 0
+            label[inpanel] = np.unique(label[inpanel], return_inverse=True)[1]
+            label[~inpanel] = -1
+            low, high = np.full(model.nnode, label.max() + 1), np.full(model.nnode, -1)
+            np.minimum.at(low, model.lnods.ravel(), np.repeat(label, 2))
+            np.maximum.at(high, model.lnods.ravel(), np.repeat(label, 2))
+            interior = (low == high) & (low >= 0) & ~model.fixity.any(axis=1)
+            types    = _panel_types(model, label, ~interior) if inpanel.any() else []
+
+        # Condensation, one per panel type
+        with ins.phase('condensation'):
+            def condense(spec):
+                elements, nodes, boundary = spec
+                return _PanelType(model, elements, nodes, boundary, method)
+            self.types = self._map(condense, types)
+
+        # Interface system: interface DOFs are numbered in global order, so its fixed DOFs follow
+        # model.fixed_dofs
+        with ins.phase('assembly'):
+            self.interface = np.flatnonzero(~interior)
+            inode = np.full(model.nnode, -1)
+            inode[self.interface] = np.arange(len(self.interface))
+            self.interface_dofs = _node_dofs(self.interface[:, None]).ravel()
+            nidof = len(self.interface_dofs)
+
+            outside = np.flatnonzero(~inpanel)
+            ke   = element_stiffness(model.young[outside], model.csarea[outside], model.elength[outside],
+                                     model.ecos[outside], model.esin[outside])
+            K    = assemble_stiffness(nidof, inode[model.lnods[outside]], ke).tocoo()
+            rows, cols, data = [K.row], [K.col], [K.data]
+            for t in self.types:
+                t.interface_dofs = dofs = _node_dofs(inode[t.bnodes])
+                rows.append(np.repeat(dofs, dofs.shape[1], axis=1).ravel())
+                cols.append(np.tile(dofs, (1, dofs.shape[1])).ravel())
+                data.append(np.tile(t.S.ravel(), t.count))
+            self.K = sp.coo_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                   shape=(nidof, nidof)).tocsr()
+
+            fixed = model.fixity[self.interface].ravel()
+            self.interface_free = np.flatnonzero(~fixed)
+            self.Kff = self.K[self.interface_free][:, self.interface_free]
+            self.interface_fixed = np.flatnonzero(fixed)
+            self.Kfp = self.K[self.interface_free][:, self.interface_fixed]
+
+        factor_start = time.perf_counter()
+        with ins.phase('factorization'):
+            self.factor = sv.factorize(self.Kff, method=method, dofs=self.interface_dofs[self.interface_free])
+
+        self.factor_time = time.perf_counter() - factor_start
+        self.setup_time  = time.perf_counter() - start
+        count_factor(ins, self.ngdof, self.factor)
+        ins.count('panels', int(sum(t.count for t in self.types)))
+        ins.count('panel_types', len(self.types))
+        ins.count('interface_dofs', nidof)
+
+    @property
+    def stats(self):
+        return dict(self.factor.stats, panels=sum(t.count for t in self.types), panel_types=len(self.types),
+                    interface_dofs=len(self.interface_dofs))
+
+    # Run fn over items on the worker threads, or in order in this thread
+    def _map(self, fn, items):
+        if self.workers == 0 or len(items) < 2:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(fn, items))
+
+    # Solve for F (ngdof,) or (ngdof, ncase) with the prescribed displacements U of the fixed DOFs
+    # ((nfixed,) or (nfixed, ncase), None for zero), as truss2D.TrussAnalysis.solve. Returns q, R, stresses.
+    def solve(self, F, U=None):
+        ins = self.instrument
+        F = np.asarray(F, dtype=float)
+        q = np.zeros_like(F)
+
+        with ins.phase('solve'):
+            FI = F[self.interface_dofs]
+            for t in self.types:
+                if t.idofs.shape[1]:
+                    Fi = F[t.idofs]
+                    if Fi.any():
+                        np.add.at(FI, t.interface_dofs, np.einsum('ij,ni...->nj...', t.T, Fi))
+            rhs = FI[self.interface_free]
+            qI  = np.zeros_like(FI)
+            if U is not None:
+                U = np.asarray(U, dtype=float)
+                U = U if U.ndim == F.ndim else np.broadcast_to(U[:, None], (len(U),) + F.shape[1:])
+                qI[self.interface_fixed] = U
+                rhs = rhs - self.Kfp @ U
+            qI[self.interface_free] = self.factor.solve(rhs)
+            q[self.interface_dofs] = qI
+
+        # Interior displacements of each panel type, in chunks of instances spread over the workers, then
+        # the member results
+        model = self.model
+        with ins.phase('recovery'):
+            threads = 1 if self.workers == 0 else self.workers or os.cpu_count()
+            chunks  = [(t, rows) for t in self.types if t.idofs.shape[1]
+                       for rows in np.array_split(np.arange(t.count), min(threads, max(1, t.count // 64)))]
+            self._map(lambda chunk: chunk[0].recover(q, F, chunk[1]), chunks)
+            results = recover_elements(model, q)
+
+        # Reactions K q - F from the member forces, without the global K
+        with ins.phase('reactions'):
+            B = sp.csr_matrix((model.b.ravel(), (model.dofs.ravel(), np.repeat(np.arange(model.nelem), 4))),
+                              shape=(self.ngdof, model.nelem))
+            R = B @ results['force'] - F
+
+        return q, R, results['stress']
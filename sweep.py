@@ -0,0 +1,196 @@
+import math
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import solver as sv
+from truss2D import element_dofs
+
+
+# Arrays shared with the workers through shared memory, attached once per worker process
+_shared = {}
+
+
+def _share(arrays):
+    blocks, spec = [], {}
+    for name, array in arrays.items():
+        if array is None:
+            continue
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec
+
+
+def _attach(spec, options):
+    _shared.clear()
+    _shared['options'] = options
+    _shared['blocks']  = []
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared['blocks'].append(block)
+        _shared[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    _shared['pattern'] = None
+    _shared['factor']  = None
+
+
+# Sparsity pattern of Kff for the fixed topology: position of every element-matrix entry in the CSR data
+# (-1 for entries on fixed DOFs), so each sample's Kff is assembled with one bincount
+def _kff_pattern(lnods, free_dofs, ngdof):
+    free_index = np.full(ngdof, -1)
+    free_index[free_dofs] = np.arange(len(free_dofs))
+
+    dofs = free_index[element_dofs(lnods)]
+    rows = np.repeat(dofs, 4, axis=1).ravel()
+    cols = np.tile(dofs, (1, 4)).ravel()
+    keep = (rows >= 0) & (cols >= 0)
+
+    nfree = len(free_dofs)
+    keys, inverse = np.unique(rows[keep] * nfree + cols[keep], return_inverse=True)
+    position = np.full(len(rows), -1)
+    position[keep] = inverse
+
+    indptr = np.searchsorted(keys // nfree, np.arange(nfree + 1))
+    return position, keep, keys % nfree, indptr
+
+
+def _run_chunk(start, stop):
+    s       = _shared
+    options = s['options']
+    lnods, free_dofs = s['lnods'], s['free_dofs']
+    ngdof   = 2 * len(s['coord'])
+    nfree   = len(free_dofs)
+    n       = stop - start
+    dofs    = element_dofs(lnods)
+
+    # Sampled parameters for this chunk, falling back to the base model
+    young  = s['young_samples'][start:stop] if 'young_samples' in s else np.broadcast_to(s['young'], (n, len(lnods)))
+    csarea = s['csarea_samples'][start:stop] if 'csarea_samples' in s else np.broadcast_to(s['csarea'], (n, len(lnods)))
+    coord  = s['coord_samples'][start:stop] if 'coord_samples' in s else np.broadcast_to(s['coord'], (n,) + s['coord'].shape)
+    F      = s['load_samples'][start:stop] if 'load_samples' in s else np.broadcast_to(s['F'], (n, ngdof))
+
+    # Geometry of every sample in the chunk at once
+    d       = coord[:, lnods[:, 1]] - coord[:, lnods[:, 0]]
+    elength = np.hypot(d[..., 0], d[..., 1])
+    b       = np.stack([-d[..., 0], -d[..., 1], d[..., 0], d[..., 1]], axis=2) / elength[..., None]
+
+    if s['pattern'] is None:
+        s['pattern'] = _kff_pattern(lnods, free_dofs, ngdof)
+    position, keep, indices, indptr = s['pattern']
+
+    ke = (young * csarea / elength)[..., None, None] * b[..., :, None] * b[..., None, :]
+
+    def factor(i):
+        data = np.bincount(position[keep], weights=ke[i].ravel()[keep], minlength=len(indices))
+        Kff  = sp.csr_matrix((data, indices, indptr), shape=(nfree, nfree))
+        return sv.factorize(Kff, perm=s.get('perm'), method=options['method'], dofs=free_dofs)
+
+    q = np.zeros((n, ngdof))
+    if options['stiffness_fixed']:
+        # Only the loads vary: factor once per worker and solve the whole chunk in one batched solve
+        if s['factor'] is None:
+            s['factor'] = factor(0)
+        q[:, free_dofs] = s['factor'].solve(F[:, free_dofs].T).T
+    else:
+        for i in range(n):
+            q[i, free_dofs] = factor(i).solve(F[i, free_dofs])
+
+    stresses = young / elength * np.einsum('sei,sei->se', b, q[:, dofs])
+
+    # Chunk summary: moments for a parallel merge, extremes, failures and a stratified subsample for quantiles
+    rng     = np.random.default_rng(options['seed'] + start)
+    keep_n  = min(n, math.ceil(options['reservoir'] * n / options['nsamp']))
+    summary = {'count': n, 'mean': stresses.mean(axis=0), 'm2': ((stresses - stresses.mean(axis=0)) ** 2).sum(axis=0),
+               'min': stresses.min(axis=0), 'max': stresses.max(axis=0),
+               'subsample': stresses[rng.choice(n, keep_n, replace=False)]}
+
+    if 'allowable' in s:
+        failed = np.abs(stresses) > s['allowable']
+        summary['failures']        = failed.sum(axis=0)
+        summary['system_failures'] = int(failed.any(axis=1).sum())
+
+    return summary
+
+
+def _merge(total, part):
+    if not total:
+        total.update(part)
+        total['subsample'] = [part['subsample']]
+        return
+
+    n1, n2 = total['count'], part['count']
+    delta  = part['mean'] - total['mean']
+    total['mean']  = total['mean'] + delta * n2 / (n1 + n2)
+    total['m2']    = total['m2'] + part['m2'] + delta ** 2 * n1 * n2 / (n1 + n2)
+    total['count'] = n1 + n2
+    total['min']   = np.minimum(total['min'], part['min'])
+    total['max']   = np.maximum(total['max'], part['max'])
+    total['subsample'].append(part['subsample'])
+    if 'failures' in part:
+        total['failures']        = total['failures'] + part['failures']
+        total['system_failures'] = total['system_failures'] + part['system_failures']
+
+
+# Monte Carlo / parametric sweep over a base truss2D.TrussAnalysis. Any of
+#   young, csarea   (nsamp, nelem)        sampled moduli and areas
+#   coords          (nsamp, nnode, 2)     sampled node coordinates
+#   loads           (nsamp, ngdof)        sampled load vectors (otherwise the base load vector F is used)
+# may be given. The connectivity and the sample arrays are placed in shared memory and the samples are
+# solved in `chunk`-sized blocks on a ProcessPoolExecutor (workers=0 runs in-process). Within a block the
+# geometry and element matrices of all samples are computed as arrays and Kff is assembled from a fixed
+# sparsity pattern; when only the loads vary each worker factors once and solves a whole block at once.
+# Only summary statistics of the member stresses are streamed back: mean, std, min, max and `quantiles`
+# (estimated from a stratified subsample of about `reservoir` samples) and, when `allowable` is given,
+# the failure probability P(|sigma| > allowable) per member and for the system (any member failing).
+def run_sweep(analysis, F=None, young=None, csarea=None, coords=None, loads=None, allowable=None,
+              quantiles=(0.05, 0.5, 0.95), workers=None, chunk=256, reservoir=1024, seed=0):
+
+    a       = analysis
+    samples = {'young_samples': young, 'csarea_samples': csarea, 'coord_samples': coords, 'load_samples': loads}
+    sizes   = {len(v) for v in samples.values() if v is not None}
+    if len(sizes) != 1:
+        raise ValueError("Give at least one sampled array; all sampled arrays must have the same number of samples.")
+    nsamp = sizes.pop()
+    if nsamp < 1:
+        raise ValueError("The sampled arrays are empty; give at least one sample.")
+
+    arrays = {'coord': a.coord, 'lnods': a.lnods.astype(np.int32), 'young': a.young, 'csarea': a.csarea,
+              'free_dofs': a.free_dofs, 'perm': getattr(a.factor, 'perm', None),
+              'F': np.zeros(a.ngdof) if F is None else np.asarray(F, dtype=float),
+              'allowable': None if allowable is None else np.broadcast_to(np.asarray(allowable, dtype=float), (a.nelem,))}
+    arrays.update({k: np.asarray(v, dtype=float) for k, v in samples.items() if v is not None})
+
+    options = {'method': a.factor.method, 'seed': seed, 'reservoir': reservoir, 'nsamp': nsamp,
+               'stiffness_fixed': young is None and csarea is None and coords is None}
+    ranges  = [(i, min(i + chunk, nsamp)) for i in range(0, nsamp, chunk)]
+    total   = {}
+
+    blocks, spec = _share(arrays)
+    try:
+        if workers == 0:
+            _attach(spec, options)
+            for start, stop in ranges:
+                _merge(total, _run_chunk(start, stop))
+            for block in _shared.pop('blocks'):
+                block.close()
+            _shared.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(spec, options)) as pool:
+                for part in pool.map(_run_chunk, *zip(*ranges)):
+                    _merge(total, part)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    subsample = np.concatenate(total['subsample'])
+    result = {'count': total['count'], 'mean': total['mean'], 'std': np.sqrt(total['m2'] / max(total['count'] - 1, 1)),
+              'min': total['min'], 'max': total['max'],
+              'quantiles': dict(zip(quantiles, np.quantile(subsample, quantiles, axis=0)))}
+    if allowable is not None:
+        result['failure_probability']        = total['failures'] / total['count']
+        result['system_failure_probability'] = total['system_failures'] / total['count']
+
+    return result
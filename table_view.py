@@ -0,0 +1,540 @@
+import os
+import re
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+from tkinter import filedialog
+import numpy as np
+import scipy.sparse as sp
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import model_io
+
+
+# Virtualized table drawn on a Canvas. Only the cells inside the visible window are formatted and drawn,
+# so scrolling and redrawing cost O(visible cells) whatever the size of the data; the scrollbars work
+# on row/column positions rather than on a pixel scroll region. Subclasses provide
+#   shape()              (nrows, ncols) of the current view
+#   header(cols)         column titles
+#   labels(rows)         row titles (empty list for no label column)
+#   cells(rows, cols)    2D array of strings for the visible block
+#   marked(rows)         optional boolean mask of rows whose title is drawn in red
+# A query box under the table passes its text to query(); Ctrl-C copies via copy_text().
+class VirtualTable(tk.Frame):
+
+    def __init__(self, master, width=300, height=200, column_chars=11, label_chars=0, font=('Courier', 11), **kwargs):
+        super().__init__(master, **kwargs)
+        self.font      = tkfont.Font(font=font)
+        self.row_h     = self.font.metrics('linespace') + 4
+        self.col_w     = self.font.measure('0' * column_chars) + 8
+        self.label_w   = self.font.measure('0' * label_chars) + 8 if label_chars else 0
+        self.top       = 0                                          # First visible row
+        self.left      = 0                                          # First visible column
+        self.highlight = None                                       # (row, col) of the last search hit, col may be None
+
+        self.canvas = tk.Canvas(self, width=width, height=height, bg="#f0f0f0", highlightthickness=0, bd=0, takefocus=1)
+        self.vbar   = ttk.Scrollbar(self, orient='vertical', command=self._yview)
+        self.hbar   = ttk.Scrollbar(self, orient='horizontal', command=self._xview)
+        self.tools  = tk.Frame(self)
+        self.query_entry = tk.Entry(self.tools, width=14)
+        self.status = tk.Label(self.tools, text="", anchor='w')
+
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        self.hbar.grid(row=1, column=0, sticky="ew")
+        self.tools.grid(row=2, column=0, columnspan=2, sticky="ew")
+        self.query_entry.pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(self.tools, text="Go", command=self._run_query, highlightbackground="#E0E0E0").pack(side=tk.LEFT)
+        self.status.pack(side=tk.LEFT, padx=4, fill=tk.X, expand=True)
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.query_entry.bind('<Return>', lambda event: self._run_query())
+        self.canvas.bind('<Configure>', lambda event: self.redraw())
+        self.canvas.bind('<Button-1>', self._click)
+        self.canvas.bind('<MouseWheel>', lambda event: self._scroll_rows(-1 if event.delta > 0 else 1))
+        self.canvas.bind('<Shift-MouseWheel>', lambda event: self._scroll_cols(-1 if event.delta > 0 else 1))
+        self.canvas.bind('<Button-4>', lambda event: self._scroll_rows(-3))
+        self.canvas.bind('<Button-5>', lambda event: self._scroll_rows(3))
+        self.canvas.bind('<Shift-Button-4>', lambda event: self._scroll_cols(-1))
+        self.canvas.bind('<Shift-Button-5>', lambda event: self._scroll_cols(1))
+        self.canvas.bind('<Control-c>', lambda event: self._copy())
+
+    def shape(self):
+        return 0, 0
+
+    def query(self, text):
+        return ""
+
+    def header_clicked(self, col):
+        pass
+
+    def marked(self, rows):
+        return np.zeros(len(rows), dtype=bool)
+
+    # Number of rows and columns that fit in the canvas
+    def _visible(self):
+        height = max(self.canvas.winfo_height(), int(self.canvas['height']))
+        width  = max(self.canvas.winfo_width(), int(self.canvas['width']))
+        return max(1, (height - self.row_h) // self.row_h), max(1, (width - self.label_w) // self.col_w)
+
+    def redraw(self):
+        nrows, ncols = self.shape()
+        vrows, vcols = self._visible()
+        self.top  = int(np.clip(self.top, 0, max(nrows - vrows, 0)))
+        self.left = int(np.clip(self.left, 0, max(ncols - vcols, 0)))
+        rows = np.arange(self.top, min(self.top + vrows, nrows))
+        cols = np.arange(self.left, min(self.left + vcols, ncols))
+
+        c = self.canvas
+        c.delete('all')
+        x0 = self.label_w
+        if self.highlight is not None:
+            row, col = self.highlight
+            if row in rows:
+                y = (row - self.top + 1) * self.row_h
+                xa, xb = (x0, x0 + len(cols) * self.col_w) if col is None or col not in cols else \
+                         (x0 + (col - self.left) * self.col_w, x0 + (col - self.left + 1) * self.col_w)
+                c.create_rectangle(xa, y, xb, y + self.row_h, fill="#ffe08a", width=0)
+
+        c.create_rectangle(0, 0, x0 + len(cols) * self.col_w, self.row_h, fill="#d8d8d8", width=0)
+        for j, title in enumerate(self.header(cols)):
+            c.create_text(x0 + (j + 1) * self.col_w - 4, self.row_h // 2, text=title, anchor='e', font=self.font)
+        for i, (title, marked) in enumerate(zip(self.labels(rows), self.marked(rows))):
+            c.create_text(x0 - 4, (i + 1.5) * self.row_h, text=title, anchor='e', font=self.font,
+                          fill="#d00000" if marked else "#606060")
+        if len(rows) and len(cols):
+            for i, line in enumerate(self.cells(rows, cols)):
+                y = (i + 1.5) * self.row_h
+                for j, text in enumerate(line):
+                    c.create_text(x0 + (j + 1) * self.col_w - 4, y, text=text, anchor='e', font=self.font)
+
+        self.vbar.set(*(self.top / nrows, (self.top + len(rows)) / nrows) if nrows else (0, 1))
+        self.hbar.set(*(self.left / ncols, (self.left + len(cols)) / ncols) if ncols else (0, 1))
+
+    def scroll_to(self, row, col=None):
+        vrows, vcols = self._visible()
+        if not self.top <= row < self.top + vrows:
+            self.top = row - vrows // 2
+        if col is not None and not self.left <= col < self.left + vcols:
+            self.left = col - vcols // 2
+        self.redraw()
+
+    def _view(self, args, first, count, visible):
+        if args[0] == 'moveto':
+            return int(round(float(args[1]) * count))
+        step = int(args[1]) * (visible if args[2] == 'pages' else 1)
+        return first + step
+
+    def _yview(self, *args):
+        self.top = self._view(args, self.top, self.shape()[0], self._visible()[0])
+        self.redraw()
+
+    def _xview(self, *args):
+        self.left = self._view(args, self.left, self.shape()[1], self._visible()[1])
+        self.redraw()
+
+    def _scroll_rows(self, n):
+        self.top += n
+        self.redraw()
+
+    def _scroll_cols(self, n):
+        self.left += n
+        self.redraw()
+
+    # (row, col) of the cell under a canvas position; -1 for the header row or the label column
+    def _cell_at(self, x, y):
+        row = self.top + y // self.row_h - 1 if y >= self.row_h else -1
+        col = self.left + (x - self.label_w) // self.col_w if x >= self.label_w else -1
+        return int(row), int(col)
+
+    def _click(self, event):
+        self.canvas.focus_set()
+        row, col = self._cell_at(event.x, event.y)
+        if row < 0 and 0 <= col < self.shape()[1]:
+            self.header_clicked(col)
+
+    def _run_query(self):
+        try:
+            message = self.query(self.query_entry.get().strip())
+        except ValueError as e:
+            message = str(e)
+        self.status.config(text=message)
+        self.redraw()
+
+    def _copy(self):
+        self.clipboard_clear()
+        self.clipboard_append(self.copy_text())
+
+
+# Table of equally long 1D arrays, e.g. node / direction / displacement. The rows shown are an index
+# array into the data, so sorting (click a column title: ascending, descending, original) and filtering
+# are array operations that never touch Tk. Queries act on the last (value) column:
+#   top N          the N rows with the largest |value|, largest first
+#   > v, <= v ...  rows whose value compares true; "abs > v" compares |value|
+#   N              highlight the row whose first column equals N
+#   (empty)        show all rows again
+class ArrayTable(VirtualTable):
+
+    def __init__(self, master, titles, formats, **kwargs):
+        super().__init__(master, **kwargs)
+        self.titles  = list(titles)
+        self.formats = list(formats)
+        self.set_data([np.empty(0)] * len(self.titles))
+
+    def set_data(self, columns):
+        self.columns   = [np.asarray(column) for column in columns]
+        self.order     = np.arange(len(self.columns[0]))
+        self.sorted_by = None
+        self.highlight = None
+        self.status.config(text=f"{len(self.order)} rows")
+        self.redraw()
+
+    def shape(self):
+        return len(self.order), len(self.columns)
+
+    def header(self, cols):
+        marks = {1: ' ^', -1: ' v'}
+        return [self.titles[j] + (marks[self.sorted_by[1]] if self.sorted_by and self.sorted_by[0] == j else '')
+                for j in cols]
+
+    def labels(self, rows):
+        return []
+
+    def cells(self, rows, cols):
+        index = self.order[rows]
+        return np.stack([np.char.mod(self.formats[j], self.columns[j][index]) for j in cols], axis=1)
+
+    def header_clicked(self, col):
+        if self.sorted_by is None or self.sorted_by[0] != col:
+            self.sorted_by = (col, 1)
+        elif self.sorted_by[1] == 1:
+            self.sorted_by = (col, -1)
+        else:
+            self.sorted_by = None
+
+        if self.sorted_by is None:
+            self.order = np.sort(self.order)
+        else:
+            self.order = self.order[np.argsort(self.columns[col][self.order], kind='stable')]
+            if self.sorted_by[1] == -1:
+                self.order = self.order[::-1]
+        self.highlight = None
+        self.top = 0
+        self.redraw()
+
+    def query(self, text):
+        value = self.columns[-1].astype(float)
+        n     = len(value)
+        self.highlight = None
+
+        if not text:
+            self.order = np.arange(n)
+            self.sorted_by = None
+            return f"{n} rows"
+
+        match = re.fullmatch(r'top\s+(\d+)', text, re.IGNORECASE)
+        if match:
+            k    = min(int(match.group(1)), n)
+            best = np.argpartition(-np.abs(value), k - 1)[:k] if k else np.empty(0, dtype=int)
+            self.order = best[np.argsort(-np.abs(value[best]), kind='stable')]
+            self.sorted_by = None
+            self.top = 0
+            return f"Top {k} of {n} by |{self.titles[-1]}|"
+
+        match = re.fullmatch(r'(abs\s*)?(<=|>=|<|>|==|!=)\s*(\S+)', text, re.IGNORECASE)
+        if match:
+            compare = {'<': np.less, '>': np.greater, '<=': np.less_equal, '>=': np.greater_equal,
+                       '==': np.equal, '!=': np.not_equal}[match.group(2)]
+            keep = compare(np.abs(value) if match.group(1) else value, float(match.group(3)))
+            self.order = np.flatnonzero(keep)
+            self.sorted_by = None
+            self.top = 0
+            return f"{len(self.order)} of {n} rows"
+
+        if re.fullmatch(r'\d+', text):
+            hits = np.flatnonzero(self.columns[0][self.order].astype(float) == int(text))
+            if not len(hits):
+                return f"{self.titles[0]} {text} is not shown"
+            self.highlight = (int(hits[0]), None)
+            self.scroll_to(int(hits[0]))
+            return f"{self.titles[0]} {text}"
+
+        raise ValueError("Use 'top N', '> v', 'abs > v' or a number")
+
+    def copy_text(self):
+        rows = np.arange(len(self.order))
+        lines = ['\t'.join(self.titles)] + ['\t'.join(line) for line in self.cells(rows, range(len(self.columns)))]
+        return '\n'.join(lines)
+
+
+# Dense or sparse matrix table, virtualized in both directions: only the visible block is sliced out of
+# the matrix (K[r0:r1, c0:c1] for a CSR matrix) and formatted. Rows and columns are the 1-based global
+# DOFs. The query "i, j" (or "i j") jumps to entry (i, j), "i" to row i; Ctrl-C copies the visible block.
+class MatrixTable(VirtualTable):
+
+    def __init__(self, master, fmt='%.5g', **kwargs):
+        kwargs.setdefault('label_chars', 6)
+        super().__init__(master, **kwargs)
+        self.fmt = fmt
+        tk.Button(self.tools, text="Sparsity", command=self.show_sparsity,
+                  highlightbackground="#E0E0E0").pack(side=tk.RIGHT, padx=2)
+        self.set_matrix(None)
+
+    def set_matrix(self, matrix):
+        self.matrix    = matrix
+        self.highlight = None
+        if matrix is not None:
+            nnz = matrix.nnz if sp.issparse(matrix) else np.count_nonzero(matrix)
+            self.status.config(text=f"{matrix.shape[0]} x {matrix.shape[1]}, {nnz} non-zeros")
+        self.redraw()
+
+    def shape(self):
+        return (0, 0) if self.matrix is None else self.matrix.shape
+
+    def header(self, cols):
+        return [str(j + 1) for j in cols]
+
+    def labels(self, rows):
+        return [str(i + 1) for i in rows]
+
+    def cells(self, rows, cols):
+        block = self.matrix[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+        block = block.toarray() if sp.issparse(block) else np.asarray(block)
+        return np.char.mod(self.fmt, block)
+
+    def query(self, text):
+        nrows, ncols = self.shape()
+        numbers = re.split(r'[\s,]+', text) if text else []
+        if not 1 <= len(numbers) <= 2 or not all(n.isdigit() for n in numbers):
+            raise ValueError("Enter a row, or a row and column")
+        row = int(numbers[0]) - 1
+        col = int(numbers[1]) - 1 if len(numbers) == 2 else None
+        if not 0 <= row < nrows or (col is not None and not 0 <= col < ncols):
+            raise ValueError(f"The matrix is {nrows} x {ncols}")
+        self.highlight = (row, col)
+        self.scroll_to(row, col)
+        return f"K[{row + 1}, {col + 1}] = {self.fmt % self.matrix[row, col]}" if col is not None else f"Row {row + 1}"
+
+    def copy_text(self):
+        vrows, vcols = self._visible()
+        nrows, ncols = self.shape()
+        rows = np.arange(self.top, min(self.top + vrows, nrows))
+        cols = np.arange(self.left, min(self.left + vcols, ncols))
+        return '\n'.join('\t'.join(line) for line in self.cells(rows, cols)) if len(rows) and len(cols) else ''
+
+    # Sparsity pattern of the matrix in its own window
+    def show_sparsity(self):
+        if self.matrix is None:
+            return
+        window = tk.Toplevel(self)
+        window.title("Sparsity pattern of K")
+        figure = Figure(figsize=(5, 5), dpi=100)
+        plot   = figure.add_subplot(1, 1, 1)
+        matrix = sp.coo_matrix(self.matrix)
+        plot.spy(matrix, markersize=max(0.2, min(4.0, 300.0 / matrix.shape[0])))
+        plot.set_title(f"{matrix.shape[0]} x {matrix.shape[1]}, {matrix.nnz} non-zeros", fontsize='small')
+        canvas = FigureCanvasTkAgg(figure, master=window)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        canvas.draw()
+
+
+# Editable input table backed by a float array (rows x columns, NaN for a blank cell); rows are numbered
+# from 1. Nothing is created per row: the grid is drawn lazily like the result tables and a single Entry
+# is placed over the cell being edited (double-click, Enter or start typing; Enter moves down, Tab right,
+# Escape cancels). Ctrl-V pastes rows copied from a spreadsheet or a CSV file at the selected cell,
+# growing the table as needed, and Import loads a whole CSV file. Typing a row number in the query
+# box jumps to that row.
+class EditableTable(VirtualTable):
+
+    def __init__(self, master, titles, formats, **kwargs):
+        kwargs.setdefault('label_chars', 5)
+        super().__init__(master, **kwargs)
+        self.titles  = list(titles)
+        self.formats = list(formats)
+        self.editor  = None
+        self.bad     = np.zeros(0, dtype=bool)
+        self.on_resize = None                                   # Called with the new row count
+        tk.Button(self.tools, text="Import...", command=self.import_file,
+                  highlightbackground="#E0E0E0").pack(side=tk.RIGHT, padx=2)
+
+        self.canvas.bind('<Double-Button-1>', lambda event: self._edit(*self._cell_at(event.x, event.y)))
+        self.canvas.bind('<Return>', lambda event: self._edit(*self.highlight) if self.highlight else None)
+        self.canvas.bind('<Key>', self._key)
+        self.canvas.bind('<Control-v>', lambda event: self.paste())
+        for key, step in (('<Up>', (-1, 0)), ('<Down>', (1, 0)), ('<Left>', (0, -1)), ('<Right>', (0, 1))):
+            self.canvas.bind(key, lambda event, step=step: self._move(*step))
+        self.set_data(np.empty((0, len(self.titles))))
+
+    @property
+    def data(self):
+        return self._data
+
+    def set_data(self, data):
+        self._finish_edit(False)
+        self._data = np.asarray(data, dtype=float).reshape(-1, len(self.titles)).copy()
+        self.bad   = np.zeros(len(self._data), dtype=bool)
+        self.highlight = None
+        self.top = self.left = 0
+        self.status.config(text=f"{len(self._data)} rows")
+        self.redraw()
+        if self.on_resize is not None:
+            self.on_resize(len(self._data))
+
+    # Grow or shrink to n rows, keeping the values already entered
+    def set_rows(self, n):
+        data = np.full((n, len(self.titles)), np.nan)
+        keep = min(n, len(self._data))
+        data[:keep] = self._data[:keep]
+        top, left = self.top, self.left
+        self.set_data(data)
+        self.top, self.left = top, left
+        self.redraw()
+
+    def mark_rows(self, rows):
+        self.bad = np.zeros(len(self._data), dtype=bool)
+        self.bad[rows] = True
+        if len(rows):
+            self.scroll_to(int(rows[0]))
+        self.redraw()
+
+    def shape(self):
+        return self._data.shape
+
+    def header(self, cols):
+        return [self.titles[j] for j in cols]
+
+    def labels(self, rows):
+        return [str(i + 1) for i in rows]
+
+    def marked(self, rows):
+        return self.bad[rows]
+
+    def cells(self, rows, cols):
+        block = self._data[np.ix_(rows, cols)]
+        blank = np.isnan(block)
+        block = np.where(blank, 0.0, block)
+        text  = np.stack([np.char.mod(self.formats[j], block[:, k]) for k, j in enumerate(cols)], axis=1)
+        return np.where(blank, '', text)
+
+    def _click(self, event):
+        self._finish_edit(True)
+        super()._click(event)
+        row, col = self._cell_at(event.x, event.y)
+        nrows, ncols = self.shape()
+        if 0 <= row < nrows and 0 <= col < ncols:
+            self.highlight = (row, col)
+            self.redraw()
+
+    def _move(self, drow, dcol):
+        if self.highlight is None or not len(self._data):
+            return
+        nrows, ncols = self.shape()
+        row, col = self.highlight
+        self.highlight = (int(np.clip(row + drow, 0, nrows - 1)), int(np.clip(col + dcol, 0, ncols - 1)))
+        self.scroll_to(*self.highlight)
+
+    def _key(self, event):
+        if self.highlight is not None and event.char and (event.char.isdigit() or event.char in '+-.eE'):
+            self._edit(*self.highlight, text=event.char)
+
+    def _edit(self, row, col, text=None):
+        nrows, ncols = self.shape()
+        if not (0 <= row < nrows and 0 <= col < ncols):
+            return
+        self._finish_edit(True)
+        self.highlight = (row, col)
+        self.scroll_to(row, col)
+
+        value  = self._data[row, col]
+        editor = tk.Entry(self.canvas, font=self.font, justify='right', bd=1)
+        editor.insert(0, text if text is not None else ('' if np.isnan(value) else self.formats[col] % value))
+        self._place_editor(editor, row, col)
+        editor.focus_set()
+        editor.icursor(tk.END)
+        editor.bind('<Return>', lambda event: self._finish_edit(True, (1, 0)))
+        editor.bind('<Tab>', lambda event: self._finish_edit(True, (0, 1)) or 'break')
+        editor.bind('<Escape>', lambda event: self._finish_edit(False))
+        editor.bind('<FocusOut>', lambda event: self._finish_edit(True))
+        self.editor = (editor, row, col)
+
+    def _place_editor(self, editor, row, col):
+        self.canvas.create_window(self.label_w + (col - self.left) * self.col_w, (row - self.top + 1) * self.row_h,
+                                  window=editor, anchor='nw', width=self.col_w, height=self.row_h)
+
+    def _finish_edit(self, save, step=None):
+        if self.editor is None:
+            return
+        editor, row, col = self.editor
+        text = editor.get().strip()
+        if save:
+            try:
+                self._data[row, col] = float(text) if text else np.nan
+            except ValueError:
+                self.bell()
+                self.status.config(text=f"'{text}' is not a number")
+                return
+            self.bad[row] = False
+        self.editor = None
+        editor.destroy()
+        self.canvas.focus_set()
+        if step is not None:
+            self._move(*step)
+        self.redraw()
+
+    # An editor still open after a failed save (text that is not a number) is placed back over its cell,
+    # since the grid redraw deletes its canvas window, or cancelled when the cell has scrolled out of view
+    def redraw(self):
+        if self.editor is not None:
+            self._finish_edit(True)
+        super().redraw()
+        if self.editor is not None:
+            editor, row, col = self.editor
+            vrows, vcols = self._visible()
+            if self.top <= row < self.top + vrows and self.left <= col < self.left + vcols:
+                self._place_editor(editor, row, col)
+            else:
+                self._finish_edit(False)
+
+    # Paste tabular text from the clipboard at the selected cell (row 1, column 1 if none)
+    def paste(self):
+        try:
+            text = self.clipboard_get()
+        except tk.TclError:
+            return
+        row, col = self.highlight or (0, 0)
+        block = model_io.parse_table(text, len(self.titles) - col)
+        if len(block) == 0:
+            return
+        if row + len(block) > len(self._data):
+            self.set_rows(row + len(block))
+        self._data[row:row + len(block), col:] = block
+        self.bad[row:row + len(block)] = False
+        self.status.config(text=f"Pasted {len(block)} rows")
+        self.redraw()
+
+    def import_file(self):
+        path = filedialog.askopenfilename(parent=self, filetypes=[("CSV files", "*.csv *.txt"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            with open(path) as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            self.bell()
+            self.status.config(text=f"Cannot read {os.path.basename(path)}: {e.strerror or e}"
+                               if isinstance(e, OSError) else f"{os.path.basename(path)} is not a text file")
+            return
+        self.set_data(model_io.parse_table(text, len(self.titles)))
+
+    def query(self, text):
+        if not text.isdigit() or not 1 <= int(text) <= len(self._data):
+            raise ValueError(f"Enter a row number from 1 to {len(self._data)}")
+        row = int(text) - 1
+        self.highlight = (row, self.highlight[1] if self.highlight else 0)
+        self.scroll_to(*self.highlight)
+        return f"Row {text}"
+
+    def copy_text(self):
+        rows = np.arange(len(self._data))
+        return '\n'.join('\t'.join(line) for line in self.cells(rows, np.arange(len(self.titles)))) if len(rows) else ''
@@ -1,79 +1,368 @@
+import time
 import numpy as np
+import scipy.sparse as sp
+import solver as sv
+from instrument import NULL
 
-def truss2D(coords_entries, elements_entries, prescribed_entries, point_load_entries):
-    
-    nelem  = len(elements_entries)                                      # Total number of elements
-    lnods  = [(entry[0], entry[1]) for entry in elements_entries]       # Table of connectivities
-    young  = np.array([row[2] for row in elements_entries])             # Young's modulus
-    csarea = np.array([row[3] for row in elements_entries])             # Cross-sectional areas
-    coord  = np.array(coords_entries)                                   # Nodal coordinates
-    ngdof  =  2 * len(coords_entries)
-
-    # Element length, cosine, and sine calculations
-    elength = np.zeros(nelem)
-    ecos    = np.zeros(nelem)
-    esin    = np.zeros(nelem)
-
-    for ie, (n1, n2) in enumerate(lnods):
-        
-        dx = coord[n2 - 1, 0] - coord[n1 - 1, 0]
-        dy = coord[n2 - 1, 1] - coord[n1 - 1, 1]
-
-        elength[ie] = np.sqrt(dx ** 2 + dy ** 2)
-        ecos[ie]    = dx / elength[ie]
-        esin[ie]    = dy / elength[ie]
-
-
-    # Global stiffness matrix
-    K = np.zeros((ngdof, ngdof))
-    for ie, (n1, n2) in enumerate(lnods):
-        ke = young[ie] * csarea[ie] / elength[ie] * np.array([
-            [ ecos[ie] ** 2      ,  ecos[ie] * esin[ie], -ecos[ie] ** 2      , -ecos[ie] * esin[ie]],
-            [ ecos[ie] * esin[ie],  esin[ie] ** 2      , -ecos[ie] * esin[ie], -esin[ie] ** 2],
-            [-ecos[ie] ** 2      , -ecos[ie] * esin[ie],  ecos[ie] ** 2      ,  ecos[ie] * esin[ie]],
-            [-ecos[ie] * esin[ie], -esin[ie] ** 2      ,  ecos[ie] * esin[ie],  esin[ie] ** 2]])
-
-        dof_indices = np.array([2 * (n1 - 1), 2 * (n1 - 1) + 1, 2 * (n2 - 1), 2 * (n2 - 1) + 1])
-        for i in range(4):
-            for j in range(4):
-                K[dof_indices[i], dof_indices[j]] += ke[i, j]
-
-    # Apply boundary conditions
-    fixed_dofs = []
-    for node, dx, dy in prescribed_entries:
-        if dx: fixed_dofs.append(2 * (node - 1))
-        if dy: fixed_dofs.append(2 * (node - 1) + 1)
-
-    free_dofs = np.setdiff1d(np.arange(ngdof), fixed_dofs)
-
-    # Apply loads
-    F = np.zeros(ngdof)
-    for node, fx, fy in point_load_entries:
-        F[2 * (node - 1)] += fx
-        F[2 * (node - 1) + 1] += fy
-
-    # Solve system
-    Kff = K[np.ix_(free_dofs, free_dofs)]
-    Kfp = K[np.ix_(free_dofs, fixed_dofs)]
-    Ff  = F[free_dofs]
-
-    # Solve for displacements
-    u = np.linalg.solve(Kff, Ff)
-    q = np.zeros(ngdof)
-    q[free_dofs] = u
-
-    # Calculate reactions
-    R = np.dot(K, q) - F
-
-    # Element stresses
-    stresses = np.zeros(nelem)
-    for i, (n1, n2, E, A) in enumerate(elements_entries):
-        d = q[[2*(n1-1), 2*(n1-1)+1, 2*(n2-1), 2*(n2-1)+1]]
-        L = np.sqrt((coord[n2 -1,0] - coord[n1-1,0])**2 + (coord[n2-1,1] - coord[n1-1,1])**2)
-        c = (coord[n2-1,0] - coord[n1-1,0])/L
-        s = (coord[n2-1,1] - coord[n1-1,1])/L
-        u = np.dot(np.array([-c, -s, c, s]), d)
-        stresses[i] = (E * u)/L
-
-
-    return K, q, R, stresses
\ No newline at end of file
+
+# Element length, cosine and sine for all elements at once (lnods holds 0-based node indices)
+def element_geometry(coord, lnods):
+    d = coord[lnods[:, 1]] - coord[lnods[:, 0]]
+    elength = np.hypot(d[:, 0], d[:, 1])
+    return elength, d[:, 0] / elength, d[:, 1] / elength
+
+
+# Element b vectors [-c, -s, c, s]: the axial elongation of an element is b . d
+def element_directions(ecos, esin):
+    return np.stack([-ecos, -esin, ecos, esin], axis=1)
+
+
+# Global DOF numbers of each element, shape (nelem, 4)
+def element_dofs(lnods):
+    return np.stack([2 * lnods[:, 0], 2 * lnods[:, 0] + 1, 2 * lnods[:, 1], 2 * lnods[:, 1] + 1], axis=1)
+
+
+# Element stiffness matrices as one (nelem, 4, 4) array: ke = EA/L * b b^T with b = [-c, -s, c, s]
+def element_stiffness(young, csarea, elength, ecos, esin):
+    b = element_directions(ecos, esin)
+    k = young * csarea / elength
+    return k[:, None, None] * b[:, :, None] * b[:, None, :]
+
+
+# Scatter the element matrices into the global stiffness matrix in COO form and convert to CSR
+# (duplicate entries are summed). The dense matrix is only built when asked for.
+def assemble_stiffness(ngdof, lnods, ke, dense=False):
+    dofs = element_dofs(lnods)
+    rows = np.repeat(dofs, 4, axis=1).ravel()
+    cols = np.tile(dofs, (1, 4)).ravel()
+    K = sp.coo_matrix((ke.ravel(), (rows, cols)), shape=(ngdof, ngdof)).tocsr()
+    return K.toarray() if dense else K
+
+
+# Array-backed truss model, validated once on construction.
+#   coord   (nnode, 2) float64   nodal coordinates
+#   lnods   (nelem, 2) int32     0-based connectivity
+#   young, csarea (nelem,)       Young's modulus and cross-sectional area per element
+#   fixity  (nnode, 2) bool      fixed X / Y DOFs
+#   loads   (nnode, 2) float64   nodal point loads
+#   prescribed (nnode, 2) float64  prescribed displacements (support settlement, jacking) of the fixed DOFs;
+#                                must be zero in the free directions
+# Element lengths, direction cosines and element DOF numbers are computed here once and shared by the
+# assembly, the stress recovery and the plotting. Use from_entries for the 1-based entry lists of the GUI.
+class TrussModel:
+
+    def __init__(self, coord, lnods, young, csarea, fixity=None, loads=None, prescribed=None):
+        self.coord  = np.ascontiguousarray(coord, dtype=np.float64).reshape(-1, 2)
+        self.lnods  = np.ascontiguousarray(lnods, dtype=np.int32).reshape(-1, 2)
+        self.nnode  = len(self.coord)                                                        # Total number of nodes
+        self.nelem  = len(self.lnods)                                                        # Total number of elements
+        self.ngdof  = 2 * self.nnode
+
+        self.young  = np.ascontiguousarray(np.broadcast_to(young, (self.nelem,)), dtype=np.float64)
+        self.csarea = np.ascontiguousarray(np.broadcast_to(csarea, (self.nelem,)), dtype=np.float64)
+        self.fixity = np.zeros((self.nnode, 2), dtype=bool) if fixity is None else np.ascontiguousarray(fixity, dtype=bool)
+        self.loads  = np.zeros((self.nnode, 2)) if loads is None else np.ascontiguousarray(loads, dtype=np.float64)
+        self.prescribed = (np.zeros((self.nnode, 2)) if prescribed is None else
+                           np.ascontiguousarray(prescribed, dtype=np.float64))
+
+        self._validate()
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.elength, self.ecos, self.esin = element_geometry(self.coord, self.lnods)
+        self.dofs = element_dofs(self.lnods)
+        self.b    = element_directions(self.ecos, self.esin)
+
+        zero = np.flatnonzero(self.elength == 0)
+        if len(zero):
+            raise ValueError(f"Element(s) {', '.join(str(e + 1) for e in zero[:10])} have zero length.")
+
+    @classmethod
+    def from_entries(cls, coords_entries, elements_entries, prescribed_entries=(), point_load_entries=()):
+        coord    = np.array(coords_entries, dtype=float).reshape(-1, 2)
+        elements = np.array(elements_entries, dtype=float).reshape(-1, 4)
+        nnode    = len(coord)
+
+        if np.any(elements[:, :2] != np.round(elements[:, :2])):
+            raise ValueError("Element node numbers must be integers.")
+
+        fixity = np.zeros((nnode, 2), dtype=bool)
+        values = np.zeros((nnode, 2))
+        prescribed = prescribed_array(prescribed_entries)
+        nodes = cls._node_index(prescribed[:, 0], nnode, 'Prescribed displacement')
+        np.logical_or.at(fixity, nodes, prescribed[:, 1:3] != 0)
+        for axis in (0, 1):
+            rows = prescribed[:, 1 + axis] != 0
+            values[nodes[rows], axis] = prescribed[rows, 3 + axis]
+        loose = np.flatnonzero((prescribed[:, 1:3] == 0) & (prescribed[:, 3:] != 0))
+        if len(loose):
+            raise ValueError(f"Prescribed displacement at node {prescribed[loose[0] // 2, 0]:g} has a value in a "
+                             f"direction that is not fixed.")
+
+        loads = np.zeros((nnode, 2))
+        point_load = np.array(point_load_entries, dtype=float).reshape(-1, 3)
+        nodes = cls._node_index(point_load[:, 0], nnode, 'Point load')
+        np.add.at(loads, nodes, point_load[:, 1:])
+
+        return cls(coord, elements[:, :2].astype(np.int32) - 1, elements[:, 2], elements[:, 3], fixity, loads, values)
+
+    @staticmethod
+    def _node_index(nodes, nnode, what):
+        bad = (nodes < 1) | (nodes > nnode) | (nodes != np.round(nodes))
+        if np.any(bad):
+            raise ValueError(f"{what} refers to node {nodes[bad][0]:g}, but nodes are numbered 1 to {nnode}.")
+        return nodes.astype(int) - 1
+
+    def _validate(self):
+        if not np.all(np.isfinite(self.coord)):
+            raise ValueError("Nodal coordinates must be finite numbers.")
+        bad = np.flatnonzero(np.any((self.lnods < 0) | (self.lnods >= self.nnode), axis=1))
+        if len(bad):
+            raise ValueError(f"Element {bad[0] + 1} refers to a node outside 1 to {self.nnode}.")
+        for name, values in (("Young's modulus", self.young), ("Cross-sectional area", self.csarea)):
+            bad = np.flatnonzero(~(values > 0) | ~np.isfinite(values))
+            if len(bad):
+                raise ValueError(f"{name} of element {bad[0] + 1} must be a positive number.")
+        if any(table.shape != (self.nnode, 2) for table in (self.fixity, self.loads, self.prescribed)):
+            raise ValueError("Fixity, load and prescribed displacement tables must have one (x, y) row per node.")
+        if not np.all(np.isfinite(self.loads)):
+            raise ValueError("Point loads must be finite numbers.")
+        if not np.all(np.isfinite(self.prescribed)):
+            raise ValueError("Prescribed displacements must be finite numbers.")
+        if np.any(self.prescribed[~self.fixity] != 0):
+            raise ValueError("Prescribed displacements must be zero in the free directions.")
+
+    @property
+    def fixed_dofs(self):
+        return np.flatnonzero(self.fixity.ravel())
+
+    @property
+    def free_dofs(self):
+        return np.flatnonzero(~self.fixity.ravel())
+
+    # Load vector of the model's own point loads
+    @property
+    def F(self):
+        return self.loads.ravel().copy()
+
+    # The model's prescribed displacements at the fixed DOFs, in fixed_dofs order
+    @property
+    def U(self):
+        return self.prescribed.ravel()[self.fixed_dofs]
+
+
+# Prescribed displacement entries as a (k, 5) array of (node, fix x, fix y, ux, uy). Rows of three,
+# (node, fix x, fix y), prescribe zero displacement; a non-zero fix flag fixes the direction.
+def prescribed_array(prescribed_entries):
+    if isinstance(prescribed_entries, np.ndarray) and prescribed_entries.ndim == 2:
+        rows = prescribed_entries.astype(float)
+    else:
+        rows = [list(row) for row in prescribed_entries]
+        if any(len(row) not in (3, 5) for row in rows):
+            raise ValueError("Prescribed displacement rows must be (node, x, y) or (node, x, y, ux, uy).")
+        rows = np.array([row + [0.0, 0.0] if len(row) == 3 else row for row in rows], dtype=float)
+    rows = rows.reshape(len(rows), -1) if len(rows) else np.empty((0, 5))
+    if rows.shape[1] == 3:
+        rows = np.c_[rows, np.zeros((len(rows), 2))]
+    elif rows.shape[1] != 5:
+        raise ValueError("Prescribed displacement rows must be (node, x, y) or (node, x, y, ux, uy).")
+    return rows
+
+
+# Prepared model: assembles K and factors Kff once, then solves any number of load cases.
+# solver='sparse' factors Kff with solver.SparseCholesky after a node RCM reordering ('banded' or 'splu'
+# force one of its methods) and solver='dense' uses a dense Cholesky factorization.
+# `progress`, if given, is called with the name of each phase as it starts: 'assembly', 'factorization',
+# then 'solve' and 'recovery' on every solve. Prescribed displacements U of the fixed DOFs enter a solve as
+# the right-hand side F_f - Kfp U, so settlement scenarios are extra columns against the same factor of Kff.
+# K and factor, when given, are a stiffness matrix and a factorization of Kff already computed for this
+# model (see cache.AnalysisCache) and skip assembly and factorization.
+# `instrument`, an instrument.Instrumentation, times the finer
+# phases assembly, partition, ordering, factorization, solve, reactions and recovery and counts ndof, nfree,
+# nnz, the factorization method, bandwidth and fill.
+class TrussAnalysis:
+
+    def __init__(self, model, solver='sparse', progress=None, instrument=None, K=None, factor=None):
+
+        start = time.perf_counter()
+        self.progress   = progress or (lambda phase: None)
+        self.instrument = ins = instrument or NULL
+        self.model = model
+        self.coord,   self.lnods, self.young, self.csarea = model.coord, model.lnods, model.young, model.csarea
+        self.elength, self.ecos,  self.esin               = model.elength, model.ecos, model.esin
+        self.nelem,   self.ngdof                          = model.nelem, model.ngdof
+
+        # Global stiffness matrix
+        self.progress('assembly')
+        if K is None:
+            with ins.phase('assembly'):
+                ke = element_stiffness(self.young, self.csarea, self.elength, self.ecos, self.esin)
+                K  = assemble_stiffness(self.ngdof, self.lnods, ke)
+        self.K = K
+
+        # Apply boundary conditions
+        self.fixed_dofs = model.fixed_dofs
+        self.free_dofs  = model.free_dofs
+
+        # Partition and factor
+        with ins.phase('partition'):
+            self.Kff = self.K[self.free_dofs][:, self.free_dofs]
+            self.Kfp = self.K[self.free_dofs][:, self.fixed_dofs]
+
+        factor_start = time.perf_counter()
+        if factor is None:
+            method = 'auto' if solver == 'sparse' else solver
+            with ins.phase('ordering'):
+                perm = sv.dof_order(sv.rcm_node_order(self.lnods, model.nnode), self.free_dofs)
+            self.progress('factorization')
+            factor_start = time.perf_counter()
+            with ins.phase('factorization'):
+                factor = sv.factorize(self.Kff, perm=perm, method=method, dofs=self.free_dofs)
+        self.factor = factor
+
+        self.factor_time = time.perf_counter() - factor_start                                # Seconds spent factoring Kff
+        self.setup_time  = time.perf_counter() - start                                       # Seconds for assembly + factorization
+        count_factor(ins, self.ngdof, self.factor)
+
+    @property
+    def stats(self):
+        return self.factor.stats
+
+    # Load vector of one case given as [(node, fx, fy), ...]
+    def load_vector(self, point_load_entries):
+        return self.load_matrix([point_load_entries])[:, 0]
+
+    # Load block of shape (ngdof, ncase), one column per case
+    def load_matrix(self, load_cases):
+        loads = np.zeros((len(load_cases), self.model.nnode, 2))
+        for case, point_load_entries in enumerate(load_cases):
+            point_load = np.array(point_load_entries, dtype=float).reshape(-1, 3)
+            nodes = TrussModel._node_index(point_load[:, 0], self.model.nnode, 'Point load')
+            np.add.at(loads[case], nodes, point_load[:, 1:])
+        return loads.reshape(len(load_cases), self.ngdof).T
+
+    # Prescribed displacement block of shape (nfixed, ncase), one column per settlement case given as
+    # [(node, ux, uy), ...]; only fixed directions may be displaced
+    def settlement_matrix(self, settlement_cases):
+        U = np.zeros((len(settlement_cases), self.model.nnode, 2))
+        for case, settlement_entries in enumerate(settlement_cases):
+            settlement = np.array(settlement_entries, dtype=float).reshape(-1, 3)
+            nodes = TrussModel._node_index(settlement[:, 0], self.model.nnode, 'Settlement')
+            U[case, nodes] = settlement[:, 1:]
+            loose = (U[case] != 0) & ~self.model.fixity
+            if loose.any():
+                raise ValueError(f"Settlement case {case + 1} displaces node {np.flatnonzero(loose.any(axis=1))[0] + 1} "
+                                 f"in a direction that is not fixed.")
+        return U.reshape(len(settlement_cases), self.ngdof)[:, self.fixed_dofs].T
+
+    # Load cases and settlement cases solved together in one batched solve: columns 0..nload-1 of the results
+    # are the load cases (with the model's own prescribed displacements), the remaining columns the
+    # settlement cases (no loads). Returns q, R and stresses as solve does.
+    def solve_cases(self, load_cases=(), settlement_cases=()):
+        nload, nsettle = len(load_cases), len(settlement_cases)
+        F = np.zeros((self.ngdof, nload + nsettle))
+        U = np.zeros((len(self.fixed_dofs), nload + nsettle))
+        if nload:
+            F[:, :nload] = self.load_matrix(load_cases)
+            U[:, :nload] = self.model.U[:, None]
+        if nsettle:
+            U[:, nload:] = self.settlement_matrix(settlement_cases)
+        return self.solve(F, U)
+
+    # Solve for F of shape (ngdof,) or (ngdof, ncase) with one batched triangular solve. U holds the
+    # displacements of the fixed DOFs, (nfixed,) for every case or (nfixed, ncase); None means zero.
+    # Returns displacements q, reactions R (same shape as F) and stresses (nelem,) or (nelem, ncase).
+    def solve(self, F, U=None):
+        ins = self.instrument
+        self.progress('solve')
+        F = np.asarray(F, dtype=float)
+        q = np.zeros_like(F)
+        with ins.phase('solve'):
+            rhs = F[self.free_dofs]
+            if U is not None:
+                U = np.asarray(U, dtype=float)
+                U = U if U.ndim == F.ndim else np.broadcast_to(U[:, None], (len(U),) + F.shape[1:])
+                q[self.fixed_dofs] = U
+                rhs = rhs - self.Kfp @ U
+            q[self.free_dofs] = self.factor.solve(rhs)
+
+        # Calculate reactions
+        self.progress('recovery')
+        with ins.phase('reactions'):
+            R = self.K @ q - F
+        with ins.phase('recovery'):
+            stresses = self.stresses(q)
+
+        return q, R, stresses
+
+    # Element stresses for one or many displacement vectors (`young` overrides the moduli)
+    def stresses(self, q, young=None):
+        return recover_elements(self.model, q, young=young)['stress']
+
+    # Full element recovery, see recover_elements
+    def recover(self, q, allowable=None, compression_allowable=None):
+        return recover_elements(self.model, q, allowable, compression_allowable)
+
+
+# Size and factorization counters of a solve: ndof, nfree, nnz of Kff, the method and, when the
+# factorization reports them, the bandwidth and fill after reordering
+def count_factor(instrument, ngdof, factor):
+    stats = factor.stats
+    instrument.count('ndof', int(ngdof))
+    instrument.count('nfree', int(stats['n']))
+    instrument.count('nnz', int(stats['nnz']))
+    instrument.count('method', stats['method'])
+    for name in ('bandwidth', 'fill'):
+        if stats.get(name + '_after') is not None:
+            instrument.count(name, int(stats[name + '_after']))
+
+
+# Element results for one displacement vector (ngdof,) or a block of them (ngdof, ncase), computed for all
+# elements at once from the model's precomputed geometry. Returns a dict of (nelem,) or (nelem, ncase) arrays:
+#   elongation, strain, stress, force (stress * A)
+#   utilization  |stress| / allowable, when an allowable stress is given (scalar or per element);
+#                compression_allowable, if given, is used instead for members in compression
+def recover_elements(model, q, allowable=None, compression_allowable=None, young=None):
+    q      = np.asarray(q, dtype=float)
+    young  = model.young if young is None else young
+    column = (-1,) + (1,) * (q.ndim - 1)
+
+    elongation = np.einsum('ei,ei...->e...', model.b, q[model.dofs])
+    strain     = elongation / model.elength.reshape(column)
+    stress     = strain * np.reshape(young, column)
+    results    = {'elongation': elongation, 'strain': strain, 'stress': stress,
+                  'force': stress * model.csarea.reshape(column)}
+
+    if allowable is not None:
+        limit = np.broadcast_to(np.reshape(allowable, column) if np.ndim(allowable) else allowable, stress.shape)
+        if compression_allowable is not None:
+            compression = np.broadcast_to(np.reshape(compression_allowable, column) if np.ndim(compression_allowable)
+                                          else compression_allowable, stress.shape)
+            limit = np.where(stress < 0, compression, limit)
+        results['utilization'] = np.abs(stress) / limit
+
+    return results
+
+
+# If `stats` is a dict it receives the factorization statistics (bandwidth and fill); `progress` and
+# `instrument` are passed on to TrussAnalysis (the instrumentation also times the 'input' phase). With a
+# cache.AnalysisCache as `cache`, an unchanged model is not solved again and a model whose structure is
+# unchanged reuses the stored K and factorization.
+def truss2D(coords_entries, elements_entries, prescribed_entries, point_load_entries, dense=False, solver='sparse', stats=None,
+            progress=None, instrument=None, cache=None):
+
+    with (instrument or NULL).phase('input'):
+        model = TrussModel.from_entries(coords_entries, elements_entries, prescribed_entries, point_load_entries)
+    if cache is None:
+        analysis = TrussAnalysis(model, solver=solver, progress=progress, instrument=instrument)
+        q, R, stresses = analysis.solve(model.F, model.U)
+    else:
+        analysis, (q, R, stresses) = cache.solve(model, solver=solver, progress=progress, instrument=instrument)
+
+    if stats is not None:
+        stats.update(analysis.stats)
+
+    K = analysis.K.toarray() if dense else analysis.K
+    if cache is not None and not dense:
+        K = K.copy()                                                  # The cached analysis keeps its own K
+
+    return K, q, R, stresses
@@ -0,0 +1,192 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import TwoSlopeNorm
+from matplotlib.lines import Line2D
+
+
+# Truss drawing on a matplotlib Axes with a fixed number of artists, whatever the model size:
+# all elements form one LineCollection, all nodes one scatter, and the loads and the supports one quiver
+# each. Node and element labels are drawn only for the part in view, and only when it holds at most
+# `label_limit` nodes (level of detail). The result overlay draws the deformed shape as a second
+# LineCollection colored by member stress. connect() adds drag-to-pan, which shifts a cached bitmap of
+# the axes (blitting) while the mouse moves and redraws once on release, and wheel zoom about the cursor.
+class TrussPlot:
+
+    def __init__(self, ax, label_limit=60):
+        self.ax          = ax
+        self.label_limit = label_limit
+        self.labels      = []
+        self.colorbar    = None
+        self.coord       = np.empty((0, 2))
+        self.lnods       = np.empty((0, 2), dtype=int)
+        self._drag       = None
+        self._updating   = False
+
+    # coord (nnode, 2), lnods (nelem, 2) 0-based, supports and loads (k, 3) rows of (0-based node, x, y)
+    def draw(self, coord, lnods, supports=(), loads=()):
+        ax = self.ax
+        self._clear()
+        self.coord = np.asarray(coord, dtype=float).reshape(-1, 2)
+        self.lnods = np.asarray(lnods, dtype=int).reshape(-1, 2)
+        size       = np.ptp(self.coord, axis=0).max() if len(self.coord) > 1 else 1.0
+        self.arrow = 0.15 * (size or 1.0)
+
+        self.elements = LineCollection(self.coord[self.lnods], colors='k', linewidths=1.0, zorder=1)
+        ax.add_collection(self.elements)
+        self.nodes = ax.scatter(self.coord[:, 0], self.coord[:, 1], s=16, c='red', zorder=3)
+
+        # Supports: a short blue arrow along each restrained direction; loads: a green arrow along each load
+        for rows, color, length in ((supports, 'blue', 0.5), (loads, 'green', 1.0)):
+            rows = np.asarray(rows, dtype=float).reshape(-1, 3)
+            rows = rows[(rows[:, 0] >= 0) & (rows[:, 0] < len(self.coord))]
+            node = rows[:, 0].astype(int)
+            u    = np.concatenate([np.sign(rows[:, 1]), np.zeros(len(rows))])
+            v    = np.concatenate([np.zeros(len(rows)), np.sign(rows[:, 2])])
+            at   = np.concatenate([node, node])
+            keep = (u != 0) | (v != 0)
+            if keep.any():
+                ax.quiver(self.coord[at[keep], 0], self.coord[at[keep], 1], u[keep] * length * self.arrow,
+                          v[keep] * length * self.arrow, color=color, angles='xy', scale_units='xy', scale=1,
+                          width=0.004, zorder=2)
+
+        ax.set_aspect('equal', adjustable='datalim')
+        ax.autoscale_view()
+        ax.set_xlabel('X axis')
+        ax.set_ylabel('Y axis')
+        ax.set_title('Truss Structure')
+
+        legend_elements = [Line2D([0], [0], color='red', marker='o', linestyle='', label='Nodes'),
+                           Line2D([0], [0], color='black', linestyle='-', label='Elements'),
+                           Line2D([0], [0], color='blue', linestyle='', marker='>', label='Prescribed Displacements'),
+                           Line2D([0], [0], color='green', linestyle='', marker='>', label='Point Loads')]
+        ax.legend(handles=legend_elements, loc='upper center', bbox_to_anchor=(0.85, 1.13), ncol=2,
+                  fontsize='small', markerscale=0.75)
+
+        ax.callbacks.connect('xlim_changed', lambda ax: self.update_labels())
+        ax.callbacks.connect('ylim_changed', lambda ax: self.update_labels())
+        self.update_labels()
+
+    # Deformed shape (displacements q times `scale`, by default 10% of the model size over the largest
+    # displacement) with members colored by stress (or any other per-member value, named by `label`) on a
+    # diverging scale; the undeformed truss turns grey
+    def show_results(self, q, stresses, scale=None, label='Stress', title='Deformed shape'):
+        q        = np.asarray(q, dtype=float).reshape(-1, 2)
+        stresses = np.asarray(stresses, dtype=float)
+        if scale is None:
+            qmax  = np.abs(q).max()
+            scale = (self.arrow / 1.5) / qmax if qmax > 0 else 1.0
+        self.clear_results()
+
+        limit = np.abs(stresses).max() or 1.0
+        self.deformed = LineCollection((self.coord + scale * q)[self.lnods], cmap='coolwarm',
+                                       norm=TwoSlopeNorm(0.0, -limit, limit), linewidths=2.0, zorder=2)
+        self.deformed.set_array(stresses)
+        self.ax.add_collection(self.deformed)
+        self.elements.set_color('0.75')
+        self.colorbar = self.ax.figure.colorbar(self.deformed, ax=self.ax, label=label)
+        self.ax.set_title(f'{title} (x{scale:.3g})')
+        return scale
+
+    # A mode shape (ngdof,) drawn like a deformed shape, members colored by their modal axial strain
+    def show_mode(self, shape, title, scale=None):
+        shape  = np.asarray(shape, dtype=float).reshape(-1, 2)
+        shape  = shape / (np.abs(shape).max() or 1.0)
+        d      = self.coord[self.lnods[:, 1]] - self.coord[self.lnods[:, 0]]
+        strain = np.einsum('ei,ei->e', d, shape[self.lnods[:, 1]] - shape[self.lnods[:, 0]]) / np.einsum('ei,ei->e', d, d)
+        return self.show_results(shape, strain, scale, label='Modal strain', title=title)
+
+    def clear_results(self):
+        if self.colorbar is not None:
+            self.colorbar.remove()
+            self.colorbar = None
+        if getattr(self, 'deformed', None) is not None:
+            self.deformed.remove()
+            self.deformed = None
+        if getattr(self, 'elements', None) is not None:
+            self.elements.set_color('k')
+            self.ax.set_title('Truss Structure')
+
+    def _clear(self):
+        self.clear_results()
+        self.ax.clear()
+        self.elements = None
+        self.labels   = []
+
+    # Level of detail: label the nodes and elements in view only if there are few enough of them
+    def update_labels(self):
+        if self._updating or not len(self.coord):
+            return
+        self._updating = True
+        for label in self.labels:
+            label.remove()
+        self.labels = []
+
+        (x0, x1), (y0, y1) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        inside = np.flatnonzero((self.coord[:, 0] >= x0) & (self.coord[:, 0] <= x1) &
+                                (self.coord[:, 1] >= y0) & (self.coord[:, 1] <= y1))
+        if len(inside) <= self.label_limit:
+            middle  = self.coord[self.lnods].mean(axis=1)
+            members = np.flatnonzero((middle[:, 0] >= x0) & (middle[:, 0] <= x1) &
+                                     (middle[:, 1] >= y0) & (middle[:, 1] <= y1))
+            self.labels  = [self.ax.text(*self.coord[i], f'N{i + 1}', color='blue', clip_on=True) for i in inside]
+            self.labels += [self.ax.text(*middle[i], f'E{i + 1}', color='green', clip_on=True)
+                            for i in members[:2 * self.label_limit]]
+        self._updating = False
+
+    def connect(self, canvas):
+        self.canvas = canvas
+        canvas.mpl_connect('button_press_event', self._press)
+        canvas.mpl_connect('motion_notify_event', self._motion)
+        canvas.mpl_connect('button_release_event', self._release)
+        canvas.mpl_connect('scroll_event', self._scroll)
+
+    # Pan start: keep a bitmap of the current axes and one of the empty axes to move it over
+    def _press(self, event):
+        if event.inaxes is not self.ax or event.button != 1:
+            return
+        canvas  = self.canvas
+        content = canvas.copy_from_bbox(self.ax.bbox)
+        artists = [a for a in self.ax.get_children() if a.get_visible() and a not in (self.ax.patch,) and
+                   a not in self.ax.spines.values() and a not in (self.ax.xaxis, self.ax.yaxis)]
+        for artist in artists:
+            artist.set_visible(False)
+        canvas.draw()
+        empty = canvas.copy_from_bbox(self.ax.bbox)
+        for artist in artists:
+            artist.set_visible(True)
+        canvas.restore_region(content)
+        canvas.blit(self.ax.bbox)
+        self._drag = (event.x, event.y, self.ax.get_xlim(), self.ax.get_ylim(), content, empty)
+
+    def _motion(self, event):
+        if self._drag is None or event.x is None:
+            return
+        x, y, _, _, content, empty = self._drag
+        dx, dy = int(event.x - x), int(y - event.y)                  # Bitmap rows run top to bottom
+        x0, y0, x1, y1 = content.get_extents()
+        source = (x0 + max(-dx, 0), y0 + max(-dy, 0), x1 - max(dx, 0), y1 - max(dy, 0))
+        self.canvas.restore_region(empty)
+        if source[0] < source[2] and source[1] < source[3]:
+            self.canvas.restore_region(content, bbox=source, xy=(source[0] + dx, source[1] + dy))
+        self.canvas.blit(self.ax.bbox)
+
+    def _release(self, event):
+        if self._drag is None:
+            return
+        x, y, xlim, ylim, _, _ = self._drag
+        self._drag = None
+        if event.x is not None:
+            inverse = self.ax.transData.inverted()
+            (ax0, ay0), (ax1, ay1) = inverse.transform([(x, y), (event.x, event.y)])
+            self.ax.set_xlim(xlim[0] - (ax1 - ax0), xlim[1] - (ax1 - ax0))
+            self.ax.set_ylim(ylim[0] - (ay1 - ay0), ylim[1] - (ay1 - ay0))
+        self.canvas.draw_idle()
+
+    def _scroll(self, event):
+        if event.inaxes is not self.ax:
+            return
+        factor = 1 / 1.2 if event.button == 'up' else 1.2
+        xlim, ylim = self.ax.get_xlim(), self.ax.get_ylim()
+        self.ax.set_xlim(event.xdata + (np.array(xlim) - event.xdata) * factor)
+        self.ax.set_ylim(event.ydata + (np.array(ylim) - event.ydata) * factor)
+        self.canvas.draw_idle()
@@ -0,0 +1,133 @@
+import multiprocessing as mp
+import queue
+import numpy as np
+import truss2D as tc
+import eigen
+from cache import AnalysisCache
+from instrument import Instrumentation
+from incremental import IncrementalAnalysis
+
+
+# Solver process for the GUI. Jobs run in a separate long-lived process so the Tk main loop never
+# blocks; the process reports ('progress', job, phase), then ('result', job, results) or
+# ('error', job, kind, message) on a queue that the GUI drains with after() polling. cancel() terminates
+# the process, which really stops the work, and the next submit starts a fresh one.
+class SolverWorker:
+
+    def __init__(self):
+        self._context = mp.get_context('spawn')
+        self._process = None
+        self._job     = 0
+        self._running = None
+
+    def _start(self):
+        self._jobs    = self._context.Queue()
+        self._results = self._context.Queue()
+        self._process = self._context.Process(target=_serve, args=(self._jobs, self._results), daemon=True)
+        self._process.start()
+
+    @property
+    def busy(self):
+        return self._running is not None
+
+    # Queue a calculation on the GUI entry lists; returns the job number
+    def submit(self, coords_entries, elements_entries, prescribed_entries, point_load_entries):
+        return self._submit('static', (coords_entries, elements_entries, prescribed_entries, point_load_entries), {})
+
+    # Queue an eigenanalysis: the `count` lowest vibration modes and buckling modes (see eigen.py)
+    def submit_modes(self, coords_entries, elements_entries, prescribed_entries, point_load_entries, count=10,
+                     density=7850.0, lumped=True):
+        return self._submit('modes', (coords_entries, elements_entries, prescribed_entries, point_load_entries),
+                            {'count': count, 'density': density, 'lumped': lumped})
+
+    def _submit(self, task, entries, options):
+        if self._process is None or not self._process.is_alive():
+            self._start()
+        self._job += 1
+        self._running = self._job
+        self._jobs.put((self._job, task, entries, options))
+        return self._job
+
+    # Messages that have arrived since the last poll; messages of cancelled jobs are dropped
+    def poll(self):
+        messages = []
+        while self._process is not None:
+            try:
+                message = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if message[1] != self._running:
+                continue
+            if message[0] != 'progress':
+                self._running = None
+            messages.append(message)
+
+        if self._running is not None and not self._process.is_alive():
+            messages.append(('error', self._running, 'crash', "The solver process stopped unexpectedly."))
+            self._running = None
+        return messages
+
+    def cancel(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+        self._running = None
+
+    def close(self):
+        if self._process is not None and self._process.is_alive():
+            self._jobs.put(None)
+            self._process.join(timeout=1)
+        self.cancel()
+
+
+# The process keeps an IncrementalAnalysis across jobs, so re-solving after a small edit only updates the
+# changed elements and reuses the previous factorization (a cancel restarts it from scratch). Every job is
+# instrumented and its phase times and counters are sent back with the results as 'stats'. Results are
+# also kept in a content-addressed cache, so pressing Calculate again on an unchanged model (or going back
+# to an earlier one) returns at once.
+def _serve(jobs, results):
+    session = IncrementalAnalysis()
+    cache   = AnalysisCache(max_bytes=256 * 2**20)
+    while True:
+        item = jobs.get()
+        if item is None:
+            return
+        job, task, entries, options = item
+        try:
+            ins = Instrumentation()
+            with ins.phase('input'):
+                model = tc.TrussModel.from_entries(*entries)
+            if task == 'modes':
+                results.put(('result', job, _modes(model, cache, options, ins)))
+                continue
+            with ins.phase('cache'):
+                cached = cache.result(model)
+            if cached is not None:
+                result = dict(cached, info={'method': 'cached', 'dirty_nodes': 0, 'dirty_elements': 0,
+                                            'iterations': 0, 'time': ins.total})
+            else:
+                q, R, stresses, info = session.solve(model, progress=lambda phase: results.put(('progress', job, phase)),
+                                                     instrument=ins)
+                result = {'K': session.K.copy(), 'q': q, 'R': R, 'stresses': stresses, 'info': info}
+                cache.store_result(model, result)
+            ins.count('cache_hits', cache.stats['result_hits'])
+            ins.count('cache_misses', cache.stats['result_misses'])
+            results.put(('result', job, dict(result, kind='static', stats=ins.as_dict())))
+        except np.linalg.LinAlgError as e:
+            results.put(('error', job, 'singular', str(e)))
+        except Exception as e:
+            results.put(('error', job, 'unexpected', str(e)))
+
+
+# Vibration and buckling modes, reusing the cached factorization of Kff when the structure is unchanged
+def _modes(model, cache, options, ins):
+    analysis = cache.analysis(model, instrument=ins)
+    with ins.phase('vibration'):
+        frequencies, modes = eigen.natural_modes(analysis, options['count'], options['density'], options['lumped'])
+    factors, buckling = np.empty(0), np.empty((model.ngdof, 0))
+    if model.F.any() or model.U.any():                                # Buckling needs member forces
+        with ins.phase('buckling'):
+            factors, buckling = eigen.buckling_modes(analysis, k=options['count'])
+    return {'kind': 'modes', 'frequencies': frequencies, 'modes': modes, 'load_factors': factors,
+            'buckling_modes': buckling, 'stats': ins.as_dict()}